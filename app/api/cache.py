@@ -0,0 +1,122 @@
+"""
+Redis-backed response caching for read-heavy endpoints
+"""
+
+from functools import wraps
+import time
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+import orjson
+import structlog
+
+from app.db.redis import get_redis
+
+logger = structlog.get_logger()
+
+# Endpoint arguments that never take part in the cache key; raw headers
+# vary per client, so endpoints key on values derived from them instead
+_UNKEYED_ARGS = {"db", "auth", "request", "accept"}
+
+
+def _cache_key(key_prefix: str, kwargs: dict) -> str:
+    """Build the cache key from the prefix and the scalar endpoint arguments"""
+    parts = [
+        f"{name}={value}"
+        for name, value in sorted(kwargs.items())
+        if name not in _UNKEYED_ARGS and isinstance(value, (str, int, float, bool, type(None)))
+    ]
+    return ":".join([key_prefix, *parts])
+
+
+async def _store(redis, key: str, ttl: int, body: bytes, media_type: str):
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={
+                "body": body,
+                "status_code": 200,
+                "media_type": media_type,
+                "cached_at": time.time()
+            })
+            pipe.expire(key, ttl)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("Failed to write response cache", key=key, error=str(e))
+
+
+async def _tee(body_iterator, redis, key: str, ttl: int, media_type: str):
+    """Pass a streamed body through, caching it once fully sent"""
+    chunks = []
+    async for chunk in body_iterator:
+        chunk = chunk.encode() if isinstance(chunk, str) else chunk
+        chunks.append(chunk)
+        yield chunk
+    await _store(redis, key, ttl, b"".join(chunks), media_type)
+
+
+def cached(ttl: int, key_prefix: str):
+    """Cache an endpoint's JSON body in Redis for `ttl` seconds
+    
+    Entries are Redis hashes (body, status_code, media_type, cached_at)
+    keyed on the prefix plus path/query/header arguments. Hits return the
+    stored bytes directly, skipping the database and response-model
+    validation. Endpoints may return a model or a 200 Response; streamed
+    bodies are cached after the last chunk is sent, and error responses
+    pass through uncached. Without Redis configured the endpoint runs
+    uncached.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            redis = get_redis()
+            if redis is None:
+                return await func(*args, **kwargs)
+            
+            key = _cache_key(key_prefix, kwargs)
+            
+            try:
+                entry = await redis.hmget(key, "body", "status_code", "media_type")
+                if entry[0] is not None:
+                    return Response(
+                        content=entry[0],
+                        status_code=int(entry[1]),
+                        media_type=entry[2].decode() if entry[2] else "application/json",
+                        headers={"x-cache": "HIT"}
+                    )
+            except Exception as e:
+                logger.warning("Failed to read response cache", key=key, error=str(e))
+            
+            result = await func(*args, **kwargs)
+            if isinstance(result, StreamingResponse):
+                if result.status_code == 200:
+                    result.body_iterator = _tee(result.body_iterator, redis, key, ttl, result.media_type)
+                    result.headers["x-cache"] = "MISS"
+                return result
+            
+            if isinstance(result, Response):
+                if result.status_code != 200:
+                    return result
+                body, media_type = result.body, result.media_type
+            else:
+                body, media_type = orjson.dumps(jsonable_encoder(result)), "application/json"
+            
+            await _store(redis, key, ttl, body, media_type)
+            return Response(content=body, media_type=media_type, headers={"x-cache": "MISS"})
+        
+        return wrapper
+    
+    return decorator
+
+
+async def invalidate(key_prefix: str):
+    """Drop every cached response under a key prefix"""
+    redis = get_redis()
+    if redis is None:
+        return
+    
+    try:
+        keys = [key async for key in redis.scan_iter(match=f"{key_prefix}*")]
+        if keys:
+            await redis.delete(*keys)
+    except Exception as e:
+        logger.warning("Failed to invalidate response cache", prefix=key_prefix, error=str(e))
@@ -3,57 +3,117 @@ Admin API endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, desc
-from typing import List, Optional
+from sqlalchemy import select, update, func, and_, desc, tuple_
+from typing import Optional
 from datetime import datetime, timedelta
+import asyncio
+import orjson
 import structlog
 
-from app.db.database import get_db
+from app.db.database import get_db, AsyncSessionLocal
+from app.db.redis import get_redis
+from app.db.stats_views import SELECT_SYSTEM_STATS_MV, stats_views_supported
 from app.models.user import User, ApiKey
 from app.models.job import Job
 from app.models.audit_log import AuditLog
-from app.api.schemas import (
-    UserResponse, QuotaSettings, AuditLogResponse
-)
-from app.auth import RequireAdmin, AuthContext
-from app.jobs import job_manager
+from app.api.schemas import UserListResponse, QuotaSettings, AuditLogListResponse
+from app.auth import RequireAdmin, AuthContext, forget_user_tokens, uncache_user_api_keys
+from app.jobs import job_manager, job_service
+from app.config import settings
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+SYSTEM_STATS_CACHE_KEY = "sysstats:v1"
+
+# Only one system stats request at a time runs its counts concurrently on
+# separate connections, so a burst cannot drain the pool
+_stats_fanout = asyncio.Semaphore(1)
+
+
+# SQLite stores server-default timestamps as "YYYY-MM-DD HH:MM:SS" but bound
+# datetimes with a ".ffffff" suffix, and compares them as text; keyset
+# columns and cursors are normalised to one fixed-width form there
+_SQLITE_KEYSET_TS_FORMAT = "%Y-%m-%d %H:%M:%f"
+
+
+def _keyset_timestamp(db: AsyncSession, value):
+    """Timestamp expression safe to order and compare for keyset paging"""
+    if db.bind.dialect.name == "sqlite":
+        return func.strftime(_SQLITE_KEYSET_TS_FORMAT, value)
+    return value
+
+
+async def _scalar_in_own_session(query):
+    """Run a scalar query on its own pooled connection"""
+    async with AsyncSessionLocal() as session:
+        return await session.scalar(query)
 
-@router.get("/users", response_model=List[UserResponse])
+
+async def _invalidate_system_stats():
+    """Drop the cached system stats so the next request recomputes them"""
+    redis = get_redis()
+    if redis is None:
+        return
+    
+    try:
+        await redis.delete(SYSTEM_STATS_CACHE_KEY)
+    except Exception as e:
+        logger.warning("Failed to invalidate system stats cache", error=str(e))
+
+
+@router.get(
+    "/users",
+    response_class=ORJSONResponse,
+    responses={200: {"model": UserListResponse}}
+)
 async def list_users(
     db: AsyncSession = Depends(get_db),
     auth: AuthContext = RequireAdmin,
     limit: int = 100,
-    offset: int = 0
+    after_ts: Optional[datetime] = None,
+    after_id: Optional[str] = None
 ):
-    """List all users (admin only)"""
+    """List all users (admin only)
+    
+    Keyset-paginated: pass the previous page's next_cursor as after_ts/after_id.
+    """
     
     try:
-        result = await db.execute(
-            select(User)
-            .order_by(desc(User.created_at))
-            .limit(limit)
-            .offset(offset)
-        )
-        users = result.scalars().all()
-        
-        return [
-            UserResponse(
-                id=user.id,
-                username=user.username,
-                email=user.email,
-                role=user.role,
-                enabled=user.enabled,
-                created_at=user.created_at,
-                last_login=user.last_login,
-                quotas=user.quotas
+        query = select(User)
+        sort_ts = _keyset_timestamp(db, User.created_at)
+        
+        if after_ts is not None and after_id is not None:
+            query = query.where(
+                tuple_(sort_ts, User.id) < tuple_(_keyset_timestamp(db, after_ts), after_id)
             )
-            for user in users
-        ]
+        
+        # One extra row tells whether another page exists
+        query = query.order_by(desc(sort_ts), desc(User.id)).limit(limit + 1)
+        
+        # Build response rows straight from the cursor; the payload is
+        # server-generated so it skips response-model validation
+        users = []
+        async for user in await db.stream_scalars(query):
+            users.append({
+                "id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "role": user.role,
+                "enabled": user.enabled,
+                "created_at": user.created_at,
+                "last_login": user.last_login,
+                "quotas": user.quotas
+            })
+        
+        next_cursor = None
+        if len(users) > limit:
+            del users[limit:]
+            next_cursor = {"ts": users[-1]["created_at"], "id": users[-1]["id"]}
+        
+        return ORJSONResponse(content={"users": users, "next_cursor": next_cursor})
         
     except Exception as e:
         logger.error("Failed to list users", error=str(e))
@@ -73,17 +133,21 @@ async def update_user_quotas(
     """Update user quotas (admin only)"""
     
     try:
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(quotas=quotas.dict())
+            .returning(User.id)
+        )
         
-        if not user:
+        if result.one_or_none() is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        user.quotas = quotas.dict()
         await db.commit()
+        forget_user_tokens(user_id)
         
         logger.info("User quotas updated",
                    user_id=user_id,
@@ -111,27 +175,33 @@ async def disable_user(
     """Disable a user (admin only)"""
     
     try:
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
-        
-        if not user:
+        if user_id == auth.user_id:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot disable your own account"
             )
         
-        if user.id == auth.user_id:
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(enabled=False)
+            .returning(User.username)
+        )
+        username = result.scalar_one_or_none()
+        
+        if username is None:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Cannot disable your own account"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
             )
         
-        user.enabled = False
         await db.commit()
+        forget_user_tokens(user_id)
+        await uncache_user_api_keys(db, user_id)
         
         logger.info("User disabled",
                    user_id=user_id,
-                   username=user.username,
+                   username=username,
                    disabled_by=auth.user_id)
         
         return {"message": "User disabled successfully"}
@@ -155,21 +225,25 @@ async def enable_user(
     """Enable a user (admin only)"""
     
     try:
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(enabled=True)
+            .returning(User.username)
+        )
+        username = result.scalar_one_or_none()
         
-        if not user:
+        if username is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        user.enabled = True
         await db.commit()
         
         logger.info("User enabled",
                    user_id=user_id,
-                   username=user.username,
+                   username=username,
                    enabled_by=auth.user_id)
         
         return {"message": "User enabled successfully"}
@@ -184,53 +258,74 @@ async def enable_user(
         )
 
 
-@router.get("/audit-logs", response_model=List[AuditLogResponse])
+@router.get(
+    "/audit-logs",
+    response_class=ORJSONResponse,
+    responses={200: {"model": AuditLogListResponse}}
+)
 async def list_audit_logs(
     db: AsyncSession = Depends(get_db),
     auth: AuthContext = RequireAdmin,
     limit: int = 100,
-    offset: int = 0,
+    after_ts: Optional[datetime] = None,
+    after_id: Optional[str] = None,
+    since: Optional[datetime] = None,
     action_filter: Optional[str] = None,
     resource_type_filter: Optional[str] = None,
     user_id_filter: Optional[str] = None
 ):
-    """List audit logs (admin only)"""
+    """List audit logs (admin only)
+    
+    Keyset-paginated: pass the previous page's next_cursor as after_ts/after_id.
+    Only entries newer than `since` are returned, by default the last
+    AUDIT_LOG_DEFAULT_WINDOW_DAYS days, so partitioned tables prune old months.
+    """
+    
+    if since is None:
+        since = datetime.utcnow() - timedelta(days=settings.audit_log_default_window_days)
     
     try:
-        query = select(AuditLog)
+        query = select(
+            AuditLog.id,
+            AuditLog.timestamp,
+            AuditLog.user_id,
+            AuditLog.api_key_id,
+            AuditLog.action,
+            AuditLog.resource_type,
+            AuditLog.resource_id,
+            AuditLog.details,
+            AuditLog.ip_address,
+            AuditLog.user_agent
+        )
+        
+        sort_ts = _keyset_timestamp(db, AuditLog.timestamp)
         
         # Apply filters
-        conditions = []
+        conditions = [AuditLog.timestamp >= since]
         if action_filter:
             conditions.append(AuditLog.action == action_filter)
         if resource_type_filter:
             conditions.append(AuditLog.resource_type == resource_type_filter)
         if user_id_filter:
             conditions.append(AuditLog.user_id == user_id_filter)
-        
-        if conditions:
-            query = query.where(and_(*conditions))
-        
-        query = query.order_by(desc(AuditLog.timestamp)).limit(limit).offset(offset)
-        
-        result = await db.execute(query)
-        audit_logs = result.scalars().all()
-        
-        return [
-            AuditLogResponse(
-                id=log.id,
-                timestamp=log.timestamp,
-                user_id=log.user_id,
-                api_key_id=log.api_key_id,
-                action=log.action,
-                resource_type=log.resource_type,
-                resource_id=log.resource_id,
-                details=log.details,
-                ip_address=log.ip_address,
-                user_agent=log.user_agent
+        if after_ts is not None and after_id is not None:
+            conditions.append(
+                tuple_(sort_ts, AuditLog.id) < tuple_(_keyset_timestamp(db, after_ts), after_id)
             )
-            for log in audit_logs
-        ]
+        
+        query = query.where(and_(*conditions))
+        # One extra row tells whether another page exists
+        query = query.order_by(desc(sort_ts), desc(AuditLog.id)).limit(limit + 1)
+        
+        audit_logs = [dict(row._mapping) async for row in await db.stream(query)]
+        
+        next_cursor = None
+        if len(audit_logs) > limit:
+            del audit_logs[limit:]
+            next_cursor = {"ts": audit_logs[-1]["timestamp"], "id": audit_logs[-1]["id"]}
+        
+        # Rows are server-generated, so they skip response-model validation
+        return ORJSONResponse(content={"audit_logs": audit_logs, "next_cursor": next_cursor})
         
     except Exception as e:
         logger.error("Failed to list audit logs", error=str(e))
@@ -247,39 +342,54 @@ async def get_system_stats(
 ):
     """Get system statistics (admin only)"""
     
+    redis = get_redis()
+    if redis is not None:
+        try:
+            cached = await redis.get(SYSTEM_STATS_CACHE_KEY)
+            if cached:
+                return orjson.loads(cached)
+        except Exception as e:
+            logger.warning("Failed to read system stats cache", error=str(e))
+    
     try:
-        # Get system status from job manager
-        system_status = await job_manager.get_system_status()
-        
-        # Get user count
-        users_result = await db.execute(select(func.count()).select_from(User))
-        total_users = users_result.scalar()
-        
-        # Get active users (logged in last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        active_users_result = await db.execute(
-            select(func.count())
-            .select_from(User)
-            .where(User.last_login >= thirty_days_ago)
-        )
-        active_users = active_users_result.scalar()
-        
-        # Get job stats
-        total_jobs_result = await db.execute(select(func.count()).select_from(Job))
-        total_jobs = total_jobs_result.scalar()
-        
-        jobs_today_result = await db.execute(
-            select(func.count())
-            .select_from(Job)
-            .where(Job.created_at >= datetime.utcnow().replace(hour=0, minute=0, second=0))
-        )
-        jobs_today = jobs_today_result.scalar()
-        
-        # Get API key count
-        api_keys_result = await db.execute(select(func.count()).select_from(ApiKey))
-        total_api_keys = api_keys_result.scalar()
-        
-        return {
+        if stats_views_supported(db.bind.dialect.name):
+            # Pre-aggregated roll-up, refreshed in the background
+            system_status, stats_result = await asyncio.gather(
+                job_manager.get_system_status(),
+                db.execute(SELECT_SYSTEM_STATS_MV)
+            )
+            counts = stats_result.one()
+        else:
+            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+            today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            
+            count_queries = [
+                select(func.count()).select_from(User),
+                select(func.count()).select_from(User).where(User.last_login >= thirty_days_ago),
+                select(func.count()).select_from(Job),
+                select(func.count()).select_from(Job).where(Job.created_at >= today_start),
+                select(func.count()).select_from(ApiKey)
+            ]
+            
+            # SQLite serializes connections, so extra sessions buy nothing
+            # there: fuse the counts into one round-trip on this session.
+            # Elsewhere fan out, unless another request already is
+            if db.bind.dialect.name == "sqlite" or _stats_fanout.locked():
+                system_status, stats_result = await asyncio.gather(
+                    job_manager.get_system_status(),
+                    db.execute(select(*(q.scalar_subquery() for q in count_queries)))
+                )
+                counts = stats_result.one()
+            else:
+                async with _stats_fanout:
+                    system_status, *counts = await asyncio.gather(
+                        job_manager.get_system_status(),
+                        *(_scalar_in_own_session(q) for q in count_queries)
+                    )
+        
+        total_users, active_users, total_jobs, jobs_today, total_api_keys = counts
+        
+        payload = {
             "system": system_status,
             "users": {
                 "total": total_users,
@@ -295,6 +405,18 @@ async def get_system_stats(
             }
         }
         
+        if redis is not None:
+            try:
+                await redis.set(
+                    SYSTEM_STATS_CACHE_KEY,
+                    orjson.dumps(payload),
+                    ex=settings.system_stats_cache_ttl
+                )
+            except Exception as e:
+                logger.warning("Failed to write system stats cache", error=str(e))
+        
+        return payload
+        
     except Exception as e:
         logger.error("Failed to get system stats", error=str(e))
         raise HTTPException(
@@ -312,9 +434,8 @@ async def emergency_stop_all_jobs(
     
     try:
         # Stop all jobs through job manager
-        from app.jobs import JobService
-        job_service = JobService(db)
-        await job_manager.emergency_stop_all(job_service)
+        await job_manager.emergency_stop_all(db)
+        await _invalidate_system_stats()
         
         logger.warning("Emergency stop activated by admin",
                       admin_user_id=auth.user_id)
@@ -338,10 +459,8 @@ async def cleanup_old_jobs(
     """Clean up old job records (admin only)"""
     
     try:
-        from app.jobs import JobService
-        job_service = JobService(db)
-        
-        cleaned_count = await job_service.cleanup_old_jobs(days)
+        cleaned_count = await job_service.cleanup_old_jobs(db, days)
+        await _invalidate_system_stats()
         
         logger.info("Job cleanup completed",
                    days=days,
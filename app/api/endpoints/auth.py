@@ -5,25 +5,56 @@ Authentication API endpoints
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, lambda_stmt
 from datetime import timedelta, datetime
+import asyncio
 import structlog
 
-from app.db.database import get_db
+from app.db.database import get_db, AsyncSessionLocal, dialect_insert
 from app.models.user import User, ApiKey
 from app.api.schemas import (
-    LoginRequest, TokenResponse, UserCreateRequest, UserResponse, 
-    ApiKeyCreateRequest, ApiKeyResponse, ErrorResponse
+    LoginRequest, TokenResponse, UserCreateRequest, UserResponse, USER_ROLE_BY_VALUE,
+    ApiKeyCreateRequest, ApiKeyResponse, QuotaSettings, ErrorResponse
 )
 from app.auth import (
-    hash_password, verify_password, create_access_token,
-    generate_api_key, hash_api_key, RequireAdmin, AuthContext, get_auth_context
+    hash_password, verify_password, dummy_verify_password, create_access_token,
+    generate_api_key, hash_api_key, RequireAdmin, AuthContext, get_auth_context,
+    cache_api_key, uncache_api_key
 )
 from app.config import settings
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+# Strong references to fire-and-forget tasks so they are not garbage collected
+_background_tasks: set = set()
+
+
+def _user_response(user: User) -> UserResponse:
+    """Build a UserResponse from a trusted DB row without re-validating it"""
+    return UserResponse.model_construct(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        role=USER_ROLE_BY_VALUE[user.role],
+        enabled=user.enabled,
+        created_at=user.created_at,
+        last_login=user.last_login,
+        quotas=QuotaSettings.model_construct(**user.quotas)
+    )
+
+
+async def _record_login(user_id: str):
+    """Record a successful login timestamp in its own session"""
+    try:
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(User).where(User.id == user_id).values(last_login=datetime.utcnow())
+            )
+            await session.commit()
+    except Exception as e:
+        logger.error("Failed to update last login", user_id=user_id, error=str(e))
+
 
 @router.post("/login", response_model=TokenResponse)
 async def login(
@@ -32,25 +63,34 @@ async def login(
 ):
     """Authenticate user and return JWT token"""
     
-    # Find user by username
+    # Find user by username (only the columns covered by ix_users_login)
     result = await db.execute(
-        select(User).where(
+        select(User.id, User.username, User.hashed_password, User.role).where(
             User.username == form_data.username,
             User.enabled == True
         )
     )
-    user = result.scalar_one_or_none()
+    user = result.one_or_none()
+    
+    # bcrypt is CPU-bound; keep it off the event loop. Unknown usernames pay
+    # the same cost so response timing does not reveal which accounts exist.
+    if user:
+        password_ok = await asyncio.to_thread(verify_password, form_data.password, user.hashed_password)
+    else:
+        await asyncio.to_thread(dummy_verify_password)
+        password_ok = False
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Update last login
-    user.last_login = datetime.utcnow()
-    await db.commit()
+    # Update last login without holding up the response
+    task = asyncio.create_task(_record_login(user.id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
@@ -76,56 +116,41 @@ async def create_user(
 ):
     """Create a new user (admin only)"""
     
-    # Check if username or email already exists
-    existing_result = await db.execute(
-        select(User).where(
-            (User.username == user_request.username) |
-            (User.email == user_request.email)
+    hashed_password = await asyncio.to_thread(hash_password, user_request.password)
+    
+    # Insert and detect username/email conflicts in the same statement
+    insert_stmt = (
+        dialect_insert(db)(User)
+        .values(
+            username=user_request.username,
+            email=user_request.email,
+            hashed_password=hashed_password,
+            role=user_request.role.value,
+            quotas=user_request.quotas.dict(),
+            created_at=datetime.utcnow()
         )
+        .on_conflict_do_nothing()
+        .returning(User)
     )
-    existing_user = existing_result.scalar_one_or_none()
+    user = (await db.execute(insert_stmt)).scalar_one_or_none()
     
-    if existing_user:
-        if existing_user.username == user_request.username:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Username already exists"
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Email already exists"
-            )
-    
-    # Create new user
-    user = User(
-        username=user_request.username,
-        email=user_request.email,
-        hashed_password=hash_password(user_request.password),
-        role=user_request.role.value,
-        quotas=user_request.quotas.dict(),
-        created_at=datetime.utcnow()
-    )
+    if user is None:
+        username_taken = await db.scalar(
+            select(User.id).where(User.username == user_request.username)
+        )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Username already exists" if username_taken else "Email already exists"
+        )
     
-    db.add(user)
     await db.commit()
-    await db.refresh(user)
     
     logger.info("User created", 
                user_id=user.id, 
                username=user.username, 
                created_by=auth.user_id)
     
-    return UserResponse(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        role=user.role,
-        enabled=user.enabled,
-        created_at=user.created_at,
-        last_login=user.last_login,
-        quotas=user.quotas
-    )
+    return _user_response(user)
 
 
 @router.post("/api-keys", response_model=ApiKeyResponse)
@@ -154,9 +179,10 @@ async def create_api_key(
         created_at=datetime.utcnow()
     )
     
+    # All response fields are set client-side; no refresh SELECT needed
     db.add(api_key_record)
     await db.commit()
-    await db.refresh(api_key_record)
+    await cache_api_key(api_key_record, auth.role)
     
     logger.info("API key created",
                api_key_id=api_key_record.id,
@@ -183,28 +209,30 @@ async def list_api_keys(
 ):
     """List API keys for current user or all (admin only)"""
     
-    query = select(ApiKey)
+    query = select(
+        ApiKey.id,
+        ApiKey.name,
+        ApiKey.scopes,
+        ApiKey.enabled,
+        ApiKey.created_at,
+        ApiKey.expires_at,
+        ApiKey.last_used,
+        ApiKey.quotas
+    )
     
     # Non-admin users can only see their own keys
     if auth.role != "admin":
         query = query.where(ApiKey.user_id == auth.user_id)
     
     result = await db.execute(query)
-    api_keys = result.scalars().all()
     
+    # Never return the actual key
     return [
-        ApiKeyResponse(
-            id=key.id,
-            name=key.name,
-            key=None,  # Never return the actual key
-            scopes=key.scopes,
-            enabled=key.enabled,
-            created_at=key.created_at,
-            expires_at=key.expires_at,
-            last_used=key.last_used,
-            quotas=key.quotas
-        )
-        for key in api_keys
+        ApiKeyResponse.model_construct(**{
+            **row._mapping,
+            "quotas": QuotaSettings.model_construct(**row.quotas)
+        })
+        for row in result
     ]
 
 
@@ -235,6 +263,7 @@ async def delete_api_key(
     
     await db.delete(api_key)
     await db.commit()
+    await uncache_api_key(api_key.key_hash)
     
     logger.info("API key deleted",
                api_key_id=key_id,
@@ -257,7 +286,8 @@ async def get_current_user(
         )
     
     # Get user details
-    result = await db.execute(select(User).where(User.id == auth.user_id))
+    user_id = auth.user_id
+    result = await db.execute(lambda_stmt(lambda: select(User).where(User.id == user_id)))
     user = result.scalar_one_or_none()
     
     if not user:
@@ -266,13 +296,4 @@ async def get_current_user(
             detail="User not found"
         )
     
-    return UserResponse(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        role=user.role,
-        enabled=user.enabled,
-        created_at=user.created_at,
-        last_login=user.last_login,
-        quotas=user.quotas
-    )
\ No newline at end of file
+    return _user_response(user)
\ No newline at end of file
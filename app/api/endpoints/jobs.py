@@ -2,18 +2,20 @@
 Job management API endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+import orjson
 import structlog
 
 from app.db.database import get_db
 from app.api.schemas import (
     JobCreateRequest, JobResponse, JobStopRequest, JobListResponse,
-    ErrorResponse, JobStatus
+    ErrorResponse
 )
-from app.auth import RequireAuth, RequireJobRead, RequireJobWrite, AuthContext
-from app.jobs import JobService, get_job_service, job_manager, QuotaExceededError, JobValidationError
+from app.auth import RequireAdmin, RequireJobRead, RequireJobWrite, AuthContext
+from app.jobs import job_service, job_manager, QuotaExceededError, JobValidationError
 from app.config import settings
 from app.api.websocket import broadcast_job_update, broadcast_system_event
 
@@ -21,21 +23,40 @@ logger = structlog.get_logger()
 router = APIRouter()
 
 
+def _tail_lines(text: str, n: int) -> str:
+    """Get the last n lines of text by scanning back from the end"""
+    end = len(text)
+    for _ in range(n):
+        end = text.rfind('\n', 0, end)
+        if end < 0:
+            return text
+    return text[end + 1:]
+
+
+async def _broadcast_job_event(job, event_type: str, data: dict):
+    """Broadcast a job update and matching system event to WebSocket clients"""
+    try:
+        await broadcast_job_update(job)
+        await broadcast_system_event(event_type, data, "info")
+    except Exception as e:
+        logger.error("Failed to broadcast job event",
+                   job_id=job.id, event_type=event_type, error=str(e))
+
+
 @router.post("/", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
 async def create_job(
     job_request: JobCreateRequest,
     request: Request,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     auth: AuthContext = RequireJobWrite
 ):
     """Create and start a new hping3 job"""
     
     try:
-        job_service = await get_job_service(db)
-        
         # Submit job through manager
         job = await job_manager.submit_job(
-            job_service=job_service,
+            db=db,
             job_spec=job_request,
             user_id=auth.user_id,
             api_key_id=getattr(auth.api_key, 'id', None) if auth.api_key else None,
@@ -49,44 +70,21 @@ async def create_job(
                    user_id=auth.user_id,
                    dry_run=job_request.dry_run)
         
-        # Broadcast job creation event
-        try:
-            await broadcast_job_update(job)
-            await broadcast_system_event(
-                "job_created",
-                {
-                    "job_id": str(job.id),
-                    "name": job.name,
-                    "user_id": auth.user_id,
-                    "dry_run": job_request.dry_run
-                },
-                "info"
-            )
-        except Exception as e:
-            logger.error("Failed to broadcast job creation event", 
-                       job_id=job.id, error=str(e))
-        
-        return JobResponse(
-            job_id=job.id,
-            name=job.name,
-            status=JobStatus(job.status),
-            command=job.command,
-            created_at=job.created_at,
-            started_at=job.started_at,
-            completed_at=job.completed_at,
-            user_id=job.user_id,
-            targets=job.targets,
-            traffic_type=job.traffic_type,
-            pps=job.pps,
-            duration=job.duration,
-            dry_run=job.dry_run,
-            priority=job.priority,
-            tags=job.tags,
-            packets_sent=int(job.packets_sent) if job.packets_sent else 0,
-            bytes_sent=int(job.bytes_sent) if job.bytes_sent else 0,
-            error_message=job.error_message
+        # Broadcast job creation event after the response is sent
+        background_tasks.add_task(
+            _broadcast_job_event,
+            job,
+            "job_created",
+            {
+                "job_id": str(job.id),
+                "name": job.name,
+                "user_id": auth.user_id,
+                "dry_run": job_request.dry_run
+            }
         )
         
+        return JobResponse.model_validate(job)
+        
     except QuotaExceededError as e:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -105,7 +103,11 @@ async def create_job(
         )
 
 
-@router.get("/", response_model=JobListResponse)
+@router.get(
+    "/",
+    response_class=StreamingResponse,
+    responses={200: {"model": JobListResponse}}
+)
 async def list_jobs(
     db: AsyncSession = Depends(get_db),
     auth: AuthContext = RequireJobRead,
@@ -117,12 +119,11 @@ async def list_jobs(
     """List jobs with filtering"""
     
     try:
-        job_service = await get_job_service(db)
-        
         # Non-admin users can only see their own jobs
         user_filter = None if auth.role == "admin" else auth.user_id
         
-        result = await job_service.list_jobs(
+        total, jobs = await job_service.stream_jobs(
+            db,
             user_id=user_filter,
             status_filter=status_filter,
             limit=limit,
@@ -130,36 +131,26 @@ async def list_jobs(
             tags=tags
         )
         
-        jobs = [
-            JobResponse(
-                job_id=job.id,
-                name=job.name,
-                status=JobStatus(job.status),
-                command=job.command,
-                created_at=job.created_at,
-                started_at=job.started_at,
-                completed_at=job.completed_at,
-                user_id=job.user_id,
-                targets=job.targets,
-                traffic_type=job.traffic_type,
-                pps=job.pps,
-                duration=job.duration,
-                dry_run=job.dry_run,
-                priority=job.priority,
-                tags=job.tags,
-                packets_sent=int(job.packets_sent) if job.packets_sent else 0,
-                bytes_sent=int(job.bytes_sent) if job.bytes_sent else 0,
-                error_message=job.error_message
-            )
-            for job in result["jobs"]
-        ]
+        # Rows come from the database already typed; encode them one at a
+        # time off the cursor rather than validating a JobResponse per row
+        async def body():
+            yield b'{"jobs":['
+            separator = b''
+            try:
+                async for job in jobs:
+                    yield separator + orjson.dumps(job.to_dict())
+                    separator = b','
+            except Exception as e:
+                # Headers are already sent; all we can do is log and end the body
+                logger.error("Failed while streaming jobs", error=str(e))
+                raise
+            yield b'],' + orjson.dumps({
+                "total": total,
+                "page": offset // limit + 1,
+                "per_page": limit
+            })[1:]
         
-        return JobListResponse(
-            jobs=jobs,
-            total=result["total"],
-            page=offset // limit + 1,
-            per_page=limit
-        )
+        return StreamingResponse(body(), media_type="application/json")
         
     except Exception as e:
         logger.error("Failed to list jobs", error=str(e))
@@ -178,8 +169,7 @@ async def get_job(
     """Get job details by ID"""
     
     try:
-        job_service = await get_job_service(db)
-        job = await job_service.get_job(job_id)
+        job = await job_service.get_job(db, job_id)
         
         if not job:
             raise HTTPException(
@@ -194,26 +184,7 @@ async def get_job(
                 detail="Access denied"
             )
         
-        return JobResponse(
-            job_id=job.id,
-            name=job.name,
-            status=JobStatus(job.status),
-            command=job.command,
-            created_at=job.created_at,
-            started_at=job.started_at,
-            completed_at=job.completed_at,
-            user_id=job.user_id,
-            targets=job.targets,
-            traffic_type=job.traffic_type,
-            pps=job.pps,
-            duration=job.duration,
-            dry_run=job.dry_run,
-            priority=job.priority,
-            tags=job.tags,
-            packets_sent=int(job.packets_sent) if job.packets_sent else 0,
-            bytes_sent=int(job.bytes_sent) if job.bytes_sent else 0,
-            error_message=job.error_message
-        )
+        return JobResponse.model_validate(job)
         
     except HTTPException:
         raise
@@ -228,6 +199,7 @@ async def get_job(
 @router.post("/{job_id}/stop")
 async def stop_job(
     job_id: str,
+    background_tasks: BackgroundTasks,
     stop_request: JobStopRequest = JobStopRequest(),
     db: AsyncSession = Depends(get_db),
     auth: AuthContext = RequireJobWrite
@@ -235,33 +207,29 @@ async def stop_job(
     """Stop a running job"""
     
     try:
-        job_service = await get_job_service(db)
-        
-        # Get job to check permissions
-        job = await job_service.get_job(job_id)
-        if not job:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Job not found"
-            )
-        
-        # Check permissions
-        if auth.role != "admin" and job.user_id != auth.user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied"
-            )
-        
-        # Stop job through manager
-        success = await job_manager.stop_job(
-            job_service=job_service,
+        # Stop job through manager; non-admins can only stop their own jobs
+        job = await job_manager.stop_job(
+            db=db,
             job_id=job_id,
             user_id=auth.user_id,
             api_key_id=getattr(auth.api_key, 'id', None) if auth.api_key else None,
-            force=stop_request.force
+            force=stop_request.force,
+            owner_id=None if auth.role == "admin" else auth.user_id
         )
         
-        if not success:
+        if job is None:
+            # Nothing was updated; work out why only on this slow path
+            owner = await job_service.get_job_owner(db, job_id)
+            if owner is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Job not found"
+                )
+            if auth.role != "admin" and owner.user_id != auth.user_id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Access denied"
+                )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Job could not be stopped"
@@ -272,24 +240,18 @@ async def stop_job(
                    force=stop_request.force,
                    stopped_by=auth.user_id)
         
-        # Broadcast job stop event
-        try:
-            # Refresh job status and broadcast
-            updated_job = await job_service.get_job(job_id)
-            if updated_job:
-                await broadcast_job_update(updated_job)
-                await broadcast_system_event(
-                    "job_stopped",
-                    {
-                        "job_id": job_id,
-                        "force": stop_request.force,
-                        "stopped_by": auth.user_id
-                    },
-                    "info"
-                )
-        except Exception as e:
-            logger.error("Failed to broadcast job stop event", 
-                       job_id=job_id, error=str(e))
+        # Broadcast job stop event from the row returned by the update,
+        # after the response is sent
+        background_tasks.add_task(
+            _broadcast_job_event,
+            job,
+            "job_stopped",
+            {
+                "job_id": job_id,
+                "force": stop_request.force,
+                "stopped_by": auth.user_id
+            }
+        )
         
         return {"message": "Job stopped successfully"}
         
@@ -305,20 +267,13 @@ async def stop_job(
 
 @router.post("/stop-all")
 async def stop_all_jobs(
-    db: AsyncSession = Depends(get_db),
-    auth: AuthContext = RequireAuth
+    auth: AuthContext = RequireAdmin,
+    db: AsyncSession = Depends(get_db)
 ):
     """Emergency stop all jobs (admin only)"""
     
-    if auth.role != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin access required"
-        )
-    
     try:
-        job_service = await get_job_service(db)
-        await job_manager.emergency_stop_all(job_service)
+        await job_manager.emergency_stop_all(db)
         
         logger.warning("All jobs stopped via emergency stop",
                       stopped_by=auth.user_id)
@@ -343,8 +298,7 @@ async def get_job_logs(
     """Get job logs (stdout/stderr)"""
     
     try:
-        job_service = await get_job_service(db)
-        job = await job_service.get_job(job_id)
+        job = await job_service.get_job(db, job_id)
         
         if not job:
             raise HTTPException(
@@ -360,21 +314,15 @@ async def get_job_logs(
             )
         
         # Get logs and truncate if needed
-        stdout_log = job.stdout_log or ""
-        stderr_log = job.stderr_log or ""
-        
-        if tail > 0:
-            stdout_lines = stdout_log.split('\n')
-            stderr_lines = stderr_log.split('\n')
-            
-            stdout_log = '\n'.join(stdout_lines[-tail:])
-            stderr_log = '\n'.join(stderr_lines[-tail:])
+        full_stdout = job.stdout_log or ""
+        stdout_log = _tail_lines(full_stdout, tail)
+        stderr_log = _tail_lines(job.stderr_log or "", tail)
         
         return {
             "job_id": job_id,
             "stdout": stdout_log,
             "stderr": stderr_log,
-            "truncated": tail < len(stdout_log.split('\n')) if stdout_log else False
+            "truncated": len(stdout_log) < len(full_stdout)
         }
         
     except HTTPException:
@@ -4,60 +4,241 @@ Metrics API endpoints
 
 from fastapi import APIRouter, Depends, Response, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
-from datetime import datetime, timedelta
+from sqlalchemy import select, func, and_, case, text
+from datetime import datetime, timedelta, timezone
 from prometheus_client import (
-    Counter, Gauge, Histogram, CollectorRegistry, 
+    Histogram, CollectorRegistry, 
     generate_latest, CONTENT_TYPE_LATEST
 )
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from typing import Optional, Tuple
+import asyncio
+import time
 import structlog
 
-from app.db.database import get_db
+from app.db.database import get_db, AsyncSessionLocal, engine
 from app.models.job import Job
 from app.models.user import User, ApiKey
 from app.api.schemas import MetricsResponse
 from app.auth import RequireAuth, AuthContext
 from app.jobs import job_manager
+from app.utils.validation import target_parse_cache_info
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+ACTIVE_STATUSES = ("queued", "starting", "running")
+
+# Upper bounds for the job duration histogram (+Inf is implicit)
+JOB_DURATION_BUCKETS = tuple(b for b in Histogram.DEFAULT_BUCKETS if b != float("inf"))
+
+
+class JobMetricsCollector:
+    """Prometheus collector for job metrics derived from the database
+    
+    `refresh()` snapshots the grouped aggregations and `collect()` builds
+    fresh metric families from that snapshot on each scrape, so the
+    exported values always match the database instead of accumulating
+    across scrapes. Duration bucket counts, sum and count are computed in
+    SQL per status, so a scrape transfers O(buckets) values rather than
+    one row per job.
+    """
+    
+    def __init__(self):
+        self.jobs_by_status = []
+        self.packets_by_type = []
+        self.durations = []
+    
+    async def refresh(self, db: AsyncSession):
+        """Re-run the job aggregations and replace the snapshot"""
+        jobs_by_status_query = (
+            select(Job.status, Job.traffic_type, func.count(Job.id))
+            .group_by(Job.status, Job.traffic_type)
+        )
+        packets_by_type_query = (
+            select(
+                Job.traffic_type,
+                func.sum(Job.packets_sent),
+                func.sum(Job.bytes_sent)
+            )
+            .where(
+                and_(
+                    Job.packets_sent.isnot(None),
+                    Job.bytes_sent.isnot(None)
+                )
+            )
+            .group_by(Job.traffic_type)
+        )
+        duration = _duration_seconds(db.bind.dialect.name)
+        durations_query = (
+            select(
+                Job.status,
+                func.count(Job.id),
+                func.sum(duration),
+                *[func.sum(case((duration <= bound, 1), else_=0)) for bound in JOB_DURATION_BUCKETS]
+            )
+            .where(
+                and_(
+                    Job.started_at.isnot(None),
+                    Job.completed_at.isnot(None),
+                    Job.status.in_(["completed", "failed", "cancelled"])
+                )
+            )
+            .group_by(Job.status)
+        )
+        
+        # The three aggregations are independent; run them concurrently,
+        # the last two on their own pooled connections
+        jobs_by_status, self.packets_by_type, self.durations = await asyncio.gather(
+            db.execute(jobs_by_status_query),
+            _fetch_all_in_own_connection(packets_by_type_query),
+            _fetch_all_in_own_connection(durations_query)
+        )
+        self.jobs_by_status = jobs_by_status.all()
+    
+    def collect(self):
+        # A job's status changes over time, so per-status counts can fall
+        jobs = GaugeMetricFamily(
+            'hping_jobs',
+            'Number of jobs by status and traffic type',
+            labels=['status', 'traffic_type']
+        )
+        active = 0
+        for job_status, traffic_type, count in self.jobs_by_status:
+            jobs.add_metric([job_status, traffic_type], count)
+            if job_status in ACTIVE_STATUSES:
+                active += count
+        yield jobs
+        
+        yield GaugeMetricFamily(
+            'hping_jobs_active',
+            'Number of currently active jobs',
+            value=active
+        )
+        
+        packets = CounterMetricFamily(
+            'hping_packets_sent',
+            'Total packets sent by all jobs',
+            labels=['traffic_type']
+        )
+        bytes_sent = CounterMetricFamily(
+            'hping_bytes_sent',
+            'Total bytes sent by all jobs',
+            labels=['traffic_type']
+        )
+        for traffic_type, total_packets, total_bytes in self.packets_by_type:
+            packets.add_metric([traffic_type], total_packets or 0)
+            bytes_sent.add_metric([traffic_type], total_bytes or 0)
+        yield packets
+        yield bytes_sent
+        
+        durations = HistogramMetricFamily(
+            'hping_job_duration_seconds',
+            'Job duration in seconds',
+            labels=['status']
+        )
+        for job_status, count, total, *bucket_counts in self.durations:
+            buckets = [
+                (str(bound), bucket_count or 0)
+                for bound, bucket_count in zip(JOB_DURATION_BUCKETS, bucket_counts)
+            ]
+            buckets.append(("+Inf", count))
+            durations.add_metric([job_status], buckets, sum_value=total or 0)
+        yield durations
+
+
+class DatabasePoolCollector:
+    """Expose connection pool occupancy so saturation is observable"""
+    
+    def collect(self):
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            # Pools without fixed capacity (e.g. NullPool) have nothing to report
+            return
+        
+        connections = GaugeMetricFamily(
+            'hping_db_pool_connections',
+            'Database connection pool connections by state',
+            labels=['state']
+        )
+        connections.add_metric(['checked_in'], pool.checkedin())
+        connections.add_metric(['checked_out'], pool.checkedout())
+        connections.add_metric(['overflow'], max(pool.overflow(), 0))
+        yield connections
+        
+        yield GaugeMetricFamily(
+            'hping_db_pool_size',
+            'Configured database connection pool size',
+            value=pool.size()
+        )
+
+
+class TargetParseCacheCollector:
+    """Expose the target/CIDR parse cache hit ratio"""
+    
+    def collect(self):
+        info = target_parse_cache_info()
+        
+        requests = CounterMetricFamily(
+            'hping_target_parse_cache',
+            'Target/CIDR parse cache lookups by result',
+            labels=['result']
+        )
+        requests.add_metric(['hit'], info.hits)
+        requests.add_metric(['miss'], info.misses)
+        yield requests
+        
+        yield GaugeMetricFamily(
+            'hping_target_parse_cache_size',
+            'Parsed targets currently held in the cache',
+            value=info.currsize
+        )
+
+
 # Prometheus metrics
 registry = CollectorRegistry()
+job_metrics_collector = JobMetricsCollector()
+registry.register(job_metrics_collector)
+registry.register(DatabasePoolCollector())
+registry.register(TargetParseCacheCollector())
 
-jobs_total = Counter(
-    'hping_jobs_total', 
-    'Total number of jobs created', 
-    ['status', 'traffic_type'],
-    registry=registry
-)
+# Rendered scrapes are reused for this many seconds
+PROMETHEUS_CACHE_TTL = 5.0
 
-jobs_active = Gauge(
-    'hping_jobs_active', 
-    'Number of currently active jobs',
-    registry=registry
-)
+_metrics_cache: Optional[Tuple[float, bytes]] = None
+_metrics_lock = asyncio.Lock()
 
-packets_sent_total = Counter(
-    'hping_packets_sent_total',
-    'Total packets sent by all jobs',
-    ['traffic_type'],
-    registry=registry
-)
+# (epoch second, ISO string) last reported by the health check
+_health_ts: Tuple[int, str] = (0, "")
 
-bytes_sent_total = Counter(
-    'hping_bytes_sent_total',
-    'Total bytes sent by all jobs', 
-    ['traffic_type'],
-    registry=registry
+_ESTIMATE_USERS_AND_API_KEYS = text(
+    "SELECT relname, reltuples::bigint FROM pg_class "
+    "WHERE relname IN ('users', 'api_keys') AND relkind = 'r'"
 )
 
-job_duration_seconds = Histogram(
-    'hping_job_duration_seconds',
-    'Job duration in seconds',
-    ['status'],
-    registry=registry
-)
+
+async def _count_users_and_api_keys():
+    """Count users and API keys in one round-trip on a separate session
+    
+    On PostgreSQL these are the planner's row estimates from pg_class
+    (approximate, updated by VACUUM/ANALYZE) rather than full scans.
+    """
+    async with AsyncSessionLocal() as session:
+        if session.bind.dialect.name == "postgresql":
+            result = await session.execute(_ESTIMATE_USERS_AND_API_KEYS)
+            estimates = dict(result.all())
+            users, api_keys = estimates.get("users", -1), estimates.get("api_keys", -1)
+            # reltuples is -1 until the table has been analyzed
+            if users >= 0 and api_keys >= 0:
+                return users, api_keys
+        
+        result = await session.execute(
+            select(
+                select(func.count(User.id)).scalar_subquery(),
+                select(func.count(ApiKey.id)).scalar_subquery()
+            )
+        )
+        return result.one()
 
 
 @router.get("/", response_model=MetricsResponse)
@@ -65,60 +246,40 @@ async def get_metrics_summary(
     db: AsyncSession = Depends(get_db),
     auth: AuthContext = RequireAuth
 ):
-    """Get metrics summary"""
+    """Get metrics summary
+    
+    users_total and api_keys_total are estimates on PostgreSQL.
+    """
     
     try:
-        # Total jobs
-        total_jobs_result = await db.execute(select(func.count()).select_from(Job))
-        jobs_total_count = total_jobs_result.scalar()
-        
-        # Running jobs
-        running_jobs_result = await db.execute(
-            select(func.count())
-            .select_from(Job)
-            .where(Job.status.in_(["queued", "starting", "running"]))
-        )
-        jobs_running = running_jobs_result.scalar()
-        
-        # Completed jobs
-        completed_jobs_result = await db.execute(
-            select(func.count())
-            .select_from(Job)
-            .where(Job.status == "completed")
-        )
-        jobs_completed = completed_jobs_result.scalar()
-        
-        # Failed jobs
-        failed_jobs_result = await db.execute(
-            select(func.count())
-            .select_from(Job)
-            .where(Job.status == "failed")
-        )
-        jobs_failed = failed_jobs_result.scalar()
-        
-        # Total packets sent
-        packets_result = await db.execute(
-            select(func.sum(Job.packets_sent.cast(db.bind.dialect.name == 'sqlite' and 'INTEGER' or 'BIGINT')))
-            .select_from(Job)
-            .where(Job.packets_sent.isnot(None))
-        )
-        packets_total = packets_result.scalar() or 0
-        
-        # Total bytes sent
-        bytes_result = await db.execute(
-            select(func.sum(Job.bytes_sent.cast(db.bind.dialect.name == 'sqlite' and 'INTEGER' or 'BIGINT')))
-            .select_from(Job)
-            .where(Job.bytes_sent.isnot(None))
+        # Per-status counts and traffic totals in one grouped pass; the
+        # user/API key totals run concurrently on their own connection
+        jobs_by_status, (users_total, api_keys_total) = await asyncio.gather(
+            db.execute(
+                select(
+                    Job.status,
+                    func.count(Job.id),
+                    func.coalesce(func.sum(Job.packets_sent), 0),
+                    func.coalesce(func.sum(Job.bytes_sent), 0)
+                )
+                .group_by(Job.status)
+            ),
+            _count_users_and_api_keys()
         )
-        bytes_total = bytes_result.scalar() or 0
         
-        # Total users
-        users_result = await db.execute(select(func.count()).select_from(User))
-        users_total = users_result.scalar()
-        
-        # Total API keys
-        api_keys_result = await db.execute(select(func.count()).select_from(ApiKey))
-        api_keys_total = api_keys_result.scalar()
+        jobs_total_count = jobs_running = jobs_completed = jobs_failed = 0
+        packets_total = bytes_total = 0
+        for job_status, count, packets, bytes_sent in jobs_by_status:
+            jobs_total_count += count
+            packets_total += packets
+            bytes_total += bytes_sent
+            
+            if job_status in ACTIVE_STATUSES:
+                jobs_running += count
+            elif job_status == "completed":
+                jobs_completed = count
+            elif job_status == "failed":
+                jobs_failed = count
         
         return MetricsResponse(
             jobs_total=jobs_total_count,
@@ -139,18 +300,41 @@ async def get_metrics_summary(
         )
 
 
+def _cached_metrics() -> Optional[bytes]:
+    """Get the last rendered scrape if it is still fresh"""
+    if _metrics_cache is None:
+        return None
+    rendered_at, data = _metrics_cache
+    if time.monotonic() - rendered_at >= PROMETHEUS_CACHE_TTL:
+        return None
+    return data
+
+
 @router.get("/prometheus")
 async def get_prometheus_metrics(
     db: AsyncSession = Depends(get_db)
 ):
     """Get Prometheus metrics in text format"""
     
+    global _metrics_cache
+    
     try:
-        # Update Prometheus metrics from database
-        await _update_prometheus_metrics(db)
-        
-        # Generate Prometheus format
-        metrics_data = generate_latest(registry)
+        metrics_data = _cached_metrics()
+        if metrics_data is None:
+            # Single-flight: coincident scrapes wait for one refresh
+            async with _metrics_lock:
+                metrics_data = _cached_metrics()
+                if metrics_data is None:
+                    # Update Prometheus metrics from database; on failure
+                    # keep serving the previous snapshot
+                    try:
+                        await job_metrics_collector.refresh(db)
+                    except Exception as e:
+                        logger.error("Failed to update Prometheus metrics", error=str(e))
+                    
+                    # Generate Prometheus format
+                    metrics_data = generate_latest(registry)
+                    _metrics_cache = (time.monotonic(), metrics_data)
         
         return Response(
             content=metrics_data,
@@ -165,6 +349,16 @@ async def get_prometheus_metrics(
         )
 
 
+def _health_timestamp() -> str:
+    """Current UTC time as ISO 8601, reformatted at most once per second"""
+    global _health_ts
+    
+    now = int(time.time())
+    if _health_ts[0] != now:
+        _health_ts = (now, datetime.fromtimestamp(now, timezone.utc).isoformat())
+    return _health_ts[1]
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
@@ -174,7 +368,7 @@ async def health_check():
         
         return {
             "status": "healthy",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _health_timestamp(),
             "active_jobs": system_status["active_jobs"],
             "monitoring_active": system_status["monitoring_active"]
         }
@@ -183,68 +377,20 @@ async def health_check():
         logger.error("Health check failed", error=str(e))
         return {
             "status": "unhealthy",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _health_timestamp(),
             "error": str(e)
         }
 
 
-async def _update_prometheus_metrics(db: AsyncSession):
-    """Update Prometheus metrics from database"""
-    
-    try:
-        # Clear existing metrics
-        jobs_active.set(0)
-        
-        # Get job counts by status and traffic type
-        jobs_by_status = await db.execute(
-            select(Job.status, Job.traffic_type, func.count())
-            .group_by(Job.status, Job.traffic_type)
-        )
-        
-        for status, traffic_type, count in jobs_by_status:
-            jobs_total.labels(status=status, traffic_type=traffic_type).inc(count)
-            
-            if status in ["queued", "starting", "running"]:
-                jobs_active.inc(count)
-        
-        # Get packet/byte totals by traffic type
-        packets_by_type = await db.execute(
-            select(
-                Job.traffic_type,
-                func.sum(Job.packets_sent.cast(db.bind.dialect.name == 'sqlite' and 'INTEGER' or 'BIGINT')),
-                func.sum(Job.bytes_sent.cast(db.bind.dialect.name == 'sqlite' and 'INTEGER' or 'BIGINT'))
-            )
-            .where(
-                and_(
-                    Job.packets_sent.isnot(None),
-                    Job.bytes_sent.isnot(None)
-                )
-            )
-            .group_by(Job.traffic_type)
-        )
-        
-        for traffic_type, total_packets, total_bytes in packets_by_type:
-            if total_packets:
-                packets_sent_total.labels(traffic_type=traffic_type).inc(total_packets)
-            if total_bytes:
-                bytes_sent_total.labels(traffic_type=traffic_type).inc(total_bytes)
-        
-        # Job durations
-        completed_jobs = await db.execute(
-            select(Job.started_at, Job.completed_at, Job.status)
-            .where(
-                and_(
-                    Job.started_at.isnot(None),
-                    Job.completed_at.isnot(None),
-                    Job.status.in_(["completed", "failed", "cancelled"])
-                )
-            )
-        )
-        
-        for started_at, completed_at, status in completed_jobs:
-            if started_at and completed_at:
-                duration = (completed_at - started_at).total_seconds()
-                job_duration_seconds.labels(status=status).observe(duration)
-    
-    except Exception as e:
-        logger.error("Failed to update Prometheus metrics", error=str(e))
\ No newline at end of file
+def _duration_seconds(dialect_name: str):
+    """SQL expression for a job's run time in seconds"""
+    if dialect_name == "sqlite":
+        return (func.julianday(Job.completed_at) - func.julianday(Job.started_at)) * 86400.0
+    return func.extract("epoch", Job.completed_at - Job.started_at)
+
+
+async def _fetch_all_in_own_connection(query):
+    """Run a query on a separate pooled connection and buffer its rows"""
+    async with engine.connect() as conn:
+        result = await conn.execute(query)
+        return result.all()
@@ -2,16 +2,23 @@
 Target management API endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, update, func, exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Result
+from typing import Any, Dict, Optional
+import orjson
 import structlog
 
-from app.db.database import get_db
+from app.db.database import get_db, dialect_insert
+from app.db.allowlist_events import notify_allowlist_change
+from app.api.cache import cached, invalidate
 from app.models.target_group import TargetGroup, AllowlistEntry
 from app.api.schemas import (
-    TargetGroupRequest, TargetGroupResponse, AllowlistEntry as AllowlistEntrySchema
+    TargetGroupRequest, TargetGroupResponse, TargetGroupListResponse, TargetGroupColumnarListResponse,
+    AllowlistEntry as AllowlistEntrySchema, AllowlistListResponse, AllowlistColumnarListResponse
 )
 from app.auth import RequireTargetRead, RequireTargetWrite, RequireAdmin, AuthContext
 from app.utils.validation import network_validator, validate_cidr
@@ -19,41 +26,106 @@ from app.utils.validation import network_validator, validate_cidr
 logger = structlog.get_logger()
 router = APIRouter()
 
+TARGET_GROUPS_CACHE_PREFIX = "targets:list"
+ALLOWLIST_CACHE_PREFIX = "targets:allowlist"
 
-@router.get("/", response_model=List[TargetGroupResponse])
+# Accept value selecting the parallel-arrays representation of list endpoints
+COLUMNAR_MEDIA_TYPE = "application/vnd.api+json; columnar=1"
+
+# Columns returned by TargetGroupResponse
+TARGET_GROUP_COLUMNS = (
+    TargetGroup.id,
+    TargetGroup.name,
+    TargetGroup.description,
+    TargetGroup.targets,
+    TargetGroup.enabled,
+    TargetGroup.created_at,
+    TargetGroup.updated_at,
+)
+
+
+def _wants_columnar(accept: Optional[str] = Header(None)) -> bool:
+    """Whether the Accept header asks for columnar=1 (cache-keyed as a flag)"""
+    return accept is not None and "columnar=1" in accept
+
+
+def _columnar_response(result: Result, **extra: Any) -> ORJSONResponse:
+    """Render rows as {column: [values...]} in a single pass over the result"""
+    keys = list(result.keys())
+    columns = [[] for _ in keys]
+    for row in result:
+        for column, value in zip(columns, row):
+            column.append(value)
+    
+    return ORJSONResponse(
+        content={**dict(zip(keys, columns)), **extra},
+        media_type=COLUMNAR_MEDIA_TYPE
+    )
+
+
+def _columnar_docs(columnar_model, model=None) -> Dict[int, Dict[str, Any]]:
+    """OpenAPI entry documenting the columnar alternative for a list endpoint"""
+    doc = {"content": {COLUMNAR_MEDIA_TYPE: {"schema": columnar_model.model_json_schema()}}}
+    if model is not None:
+        doc["model"] = model
+    return {200: doc}
+
+
+def _target_group_response(target_group: TargetGroup, status_code: int = status.HTTP_200_OK) -> ORJSONResponse:
+    """Serialize a target group straight to an orjson response
+    
+    Values come from the row just written or read, so validation is skipped.
+    """
+    response = TargetGroupResponse.model_construct(**{
+        column.key: getattr(target_group, column.key) for column in TARGET_GROUP_COLUMNS
+    })
+    return ORJSONResponse(
+        content=response.model_dump(mode="json"),
+        status_code=status_code
+    )
+
+
+@router.get(
+    "/",
+    response_model=TargetGroupListResponse,
+    responses=_columnar_docs(TargetGroupColumnarListResponse)
+)
+@cached(ttl=10, key_prefix=TARGET_GROUPS_CACHE_PREFIX)
 async def list_target_groups(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=500),
+    columnar: bool = Depends(_wants_columnar),
     db: AsyncSession = Depends(get_db),
     auth: AuthContext = RequireTargetRead
 ):
-    """List all target groups"""
+    """List enabled target groups, one page at a time
     
-    try:
-        result = await db.execute(
-            select(TargetGroup)
-            .where(TargetGroup.enabled == True)
-            .order_by(TargetGroup.name)
-        )
-        target_groups = result.scalars().all()
-        
-        return [
-            TargetGroupResponse(
-                id=tg.id,
-                name=tg.name,
-                description=tg.description,
-                targets=tg.targets,
-                enabled=tg.enabled,
-                created_at=tg.created_at,
-                updated_at=tg.updated_at
-            )
-            for tg in target_groups
-        ]
-        
-    except Exception as e:
-        logger.error("Failed to list target groups", error=str(e))
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to list target groups"
-        )
+    Send `Accept: application/vnd.api+json; columnar=1` to receive the page
+    as parallel column arrays instead of an array of objects.
+    """
+    
+    total = (await db.execute(
+        select(func.count(TargetGroup.id)).where(TargetGroup.enabled == True)
+    )).scalar_one()
+    
+    # Project plain columns; DB rows are trusted so encode them directly
+    result = await db.execute(
+        select(*TARGET_GROUP_COLUMNS)
+        .where(TargetGroup.enabled == True)
+        .order_by(TargetGroup.name)
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    )
+    
+    if columnar:
+        return _columnar_response(result, total=total, page=page, per_page=per_page)
+    
+    return ORJSONResponse(content={
+        "target_groups": [row._asdict() for row in result],
+        "total": total,
+        "page": page,
+        "per_page": per_page
+    })
 
 
 @router.post("/", response_model=TargetGroupResponse, status_code=status.HTTP_201_CREATED)
@@ -64,63 +136,44 @@ async def create_target_group(
 ):
     """Create a new target group"""
     
-    try:
-        # Check if name already exists
-        existing_result = await db.execute(
-            select(TargetGroup).where(TargetGroup.name == target_group_request.name)
+    # Validate targets
+    targets_valid, target_errors = network_validator.validate_targets(target_group_request.targets)
+    if not targets_valid:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid targets: {target_errors}"
         )
-        existing_group = existing_result.scalar_one_or_none()
-        
-        if existing_group:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Target group name already exists"
-            )
-        
-        # Validate targets
-        targets_valid, target_errors = network_validator.validate_targets(target_group_request.targets)
-        if not targets_valid:
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail=f"Invalid targets: {target_errors}"
-            )
-        
-        # Create target group
-        target_group = TargetGroup(
+    
+    # Insert and detect name conflicts in the same statement
+    insert_stmt = (
+        dialect_insert(db)(TargetGroup)
+        .values(
             name=target_group_request.name,
             description=target_group_request.description,
             targets=target_group_request.targets,
             enabled=target_group_request.enabled,
             created_by=auth.user_id
         )
-        
-        db.add(target_group)
-        await db.commit()
-        await db.refresh(target_group)
-        
-        logger.info("Target group created",
-                   target_group_id=target_group.id,
-                   name=target_group_request.name,
-                   created_by=auth.user_id)
-        
-        return TargetGroupResponse(
-            id=target_group.id,
-            name=target_group.name,
-            description=target_group.description,
-            targets=target_group.targets,
-            enabled=target_group.enabled,
-            created_at=target_group.created_at,
-            updated_at=target_group.updated_at
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Failed to create target group", error=str(e))
+        .on_conflict_do_nothing(index_elements=[TargetGroup.name])
+        .returning(TargetGroup)
+    )
+    target_group = (await db.execute(insert_stmt)).scalar_one_or_none()
+    
+    if target_group is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to create target group"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Target group name already exists"
         )
+    
+    await db.commit()
+    await invalidate(TARGET_GROUPS_CACHE_PREFIX)
+    
+    logger.info("Target group created",
+               target_group_id=target_group.id,
+               name=target_group_request.name,
+               created_by=auth.user_id)
+    
+    return _target_group_response(target_group, status.HTTP_201_CREATED)
 
 
 @router.get("/{group_id}", response_model=TargetGroupResponse)
@@ -131,36 +184,18 @@ async def get_target_group(
 ):
     """Get target group by ID"""
     
-    try:
-        result = await db.execute(
-            select(TargetGroup).where(TargetGroup.id == group_id)
-        )
-        target_group = result.scalar_one_or_none()
-        
-        if not target_group:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Target group not found"
-            )
-        
-        return TargetGroupResponse(
-            id=target_group.id,
-            name=target_group.name,
-            description=target_group.description,
-            targets=target_group.targets,
-            enabled=target_group.enabled,
-            created_at=target_group.created_at,
-            updated_at=target_group.updated_at
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Failed to get target group", group_id=group_id, error=str(e))
+    result = await db.execute(
+        select(TargetGroup).where(TargetGroup.id == group_id)
+    )
+    target_group = result.scalar_one_or_none()
+    
+    if not target_group:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get target group"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Target group not found"
         )
+    
+    return _target_group_response(target_group)
 
 
 @router.put("/{group_id}", response_model=TargetGroupResponse)
@@ -172,75 +207,50 @@ async def update_target_group(
 ):
     """Update target group"""
     
+    # Validate targets
+    targets_valid, target_errors = network_validator.validate_targets(target_group_request.targets)
+    if not targets_valid:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid targets: {target_errors}"
+        )
+    
+    # Update in place; the unique constraint on name reports conflicts
     try:
-        # Get existing target group
         result = await db.execute(
-            select(TargetGroup).where(TargetGroup.id == group_id)
-        )
-        target_group = result.scalar_one_or_none()
-        
-        if not target_group:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Target group not found"
-            )
-        
-        # Check if name conflicts with another group
-        if target_group_request.name != target_group.name:
-            existing_result = await db.execute(
-                select(TargetGroup).where(
-                    TargetGroup.name == target_group_request.name,
-                    TargetGroup.id != group_id
-                )
+            update(TargetGroup)
+            .where(TargetGroup.id == group_id)
+            .values(
+                name=target_group_request.name,
+                description=target_group_request.description,
+                targets=target_group_request.targets,
+                enabled=target_group_request.enabled
             )
-            existing_group = existing_result.scalar_one_or_none()
-            
-            if existing_group:
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail="Target group name already exists"
-                )
-        
-        # Validate targets
-        targets_valid, target_errors = network_validator.validate_targets(target_group_request.targets)
-        if not targets_valid:
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail=f"Invalid targets: {target_errors}"
-            )
-        
-        # Update target group
-        target_group.name = target_group_request.name
-        target_group.description = target_group_request.description
-        target_group.targets = target_group_request.targets
-        target_group.enabled = target_group_request.enabled
-        
-        await db.commit()
-        await db.refresh(target_group)
-        
-        logger.info("Target group updated",
-                   target_group_id=group_id,
-                   name=target_group_request.name,
-                   updated_by=auth.user_id)
-        
-        return TargetGroupResponse(
-            id=target_group.id,
-            name=target_group.name,
-            description=target_group.description,
-            targets=target_group.targets,
-            enabled=target_group.enabled,
-            created_at=target_group.created_at,
-            updated_at=target_group.updated_at
+            .returning(TargetGroup)
         )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Failed to update target group", group_id=group_id, error=str(e))
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update target group"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Target group name already exists"
         )
+    
+    target_group = result.scalar_one_or_none()
+    if not target_group:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Target group not found"
+        )
+    
+    await db.commit()
+    await invalidate(TARGET_GROUPS_CACHE_PREFIX)
+    
+    logger.info("Target group updated",
+               target_group_id=group_id,
+               name=target_group_request.name,
+               updated_by=auth.user_id)
+    
+    return _target_group_response(target_group)
 
 
 @router.delete("/{group_id}")
@@ -251,68 +261,81 @@ async def delete_target_group(
 ):
     """Delete target group"""
     
-    try:
-        result = await db.execute(
-            select(TargetGroup).where(TargetGroup.id == group_id)
-        )
-        target_group = result.scalar_one_or_none()
-        
-        if not target_group:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Target group not found"
-            )
-        
-        await db.delete(target_group)
-        await db.commit()
-        
-        logger.info("Target group deleted",
-                   target_group_id=group_id,
-                   name=target_group.name,
-                   deleted_by=auth.user_id)
-        
-        return {"message": "Target group deleted successfully"}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Failed to delete target group", group_id=group_id, error=str(e))
+    result = await db.execute(
+        select(TargetGroup).where(TargetGroup.id == group_id)
+    )
+    target_group = result.scalar_one_or_none()
+    
+    if not target_group:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to delete target group"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Target group not found"
         )
+    
+    await db.delete(target_group)
+    await db.commit()
+    await invalidate(TARGET_GROUPS_CACHE_PREFIX)
+    
+    logger.info("Target group deleted",
+               target_group_id=group_id,
+               name=target_group.name,
+               deleted_by=auth.user_id)
+    
+    return {"message": "Target group deleted successfully"}
 
 
-@router.get("/allowlist/entries", response_model=List[AllowlistEntrySchema])
+@router.get(
+    "/allowlist/entries",
+    response_class=StreamingResponse,
+    responses=_columnar_docs(AllowlistColumnarListResponse, AllowlistListResponse)
+)
+@cached(ttl=60, key_prefix=ALLOWLIST_CACHE_PREFIX)
 async def get_allowlist(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=500),
+    columnar: bool = Depends(_wants_columnar),
     db: AsyncSession = Depends(get_db),
     auth: AuthContext = RequireTargetRead
 ):
-    """Get allowlist/denylist entries"""
+    """Get allowlist/denylist entries, one page at a time (columnar via Accept)"""
     
-    try:
-        result = await db.execute(
-            select(AllowlistEntry)
-            .where(AllowlistEntry.enabled == True)
-            .order_by(AllowlistEntry.entry_type, AllowlistEntry.cidr)
-        )
-        entries = result.scalars().all()
-        
-        return [
-            AllowlistEntrySchema(
-                cidr=entry.cidr,
-                description=entry.description,
-                enabled=entry.enabled
-            )
-            for entry in entries
-        ]
-        
-    except Exception as e:
-        logger.error("Failed to get allowlist", error=str(e))
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get allowlist"
-        )
+    total = (await db.execute(
+        select(func.count(AllowlistEntry.id)).where(AllowlistEntry.enabled == True)
+    )).scalar_one()
+    
+    query = (
+        select(AllowlistEntry.cidr, AllowlistEntry.description, AllowlistEntry.enabled)
+        .where(AllowlistEntry.enabled == True)
+        .order_by(AllowlistEntry.entry_type, AllowlistEntry.cidr)
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    )
+    
+    if columnar:
+        return _columnar_response(await db.execute(query), total=total, page=page, per_page=per_page)
+    
+    entries = await db.stream(query.execution_options(yield_per=200))
+    
+    # Encode each fetched batch as it comes off the cursor, so the page is
+    # never materialized and the first bytes go out before the last row
+    async def body():
+        yield b'{"entries":['
+        separator = b''
+        try:
+            async for rows in entries.partitions():
+                yield separator + b','.join(orjson.dumps(row._asdict()) for row in rows)
+                separator = b','
+        except Exception as e:
+            # Headers are already sent; all we can do is log and end the body
+            logger.error("Failed while streaming allowlist", error=str(e))
+            raise
+        yield b'],' + orjson.dumps({
+            "total": total,
+            "page": page,
+            "per_page": per_page
+        })[1:]
+    
+    return StreamingResponse(body(), media_type="application/json")
 
 
 @router.post("/allowlist/entries", status_code=status.HTTP_201_CREATED)
@@ -323,52 +346,45 @@ async def add_allowlist_entry(
 ):
     """Add allowlist/denylist entry (admin only)"""
     
-    try:
-        # Validate CIDR format
-        if not validate_cidr(entry_request.cidr):
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail="Invalid CIDR format"
-            )
-        
-        # Check if entry already exists
-        existing_result = await db.execute(
-            select(AllowlistEntry).where(AllowlistEntry.cidr == entry_request.cidr)
-        )
-        existing_entry = existing_result.scalar_one_or_none()
-        
-        if existing_entry:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Allowlist entry already exists"
-            )
-        
-        # Create entry
-        entry = AllowlistEntry(
-            cidr=entry_request.cidr,
-            description=entry_request.description,
-            enabled=entry_request.enabled,
-            entry_type="allow",  # Default to allow
-            created_by=auth.user_id
+    # Validate CIDR format
+    if not validate_cidr(entry_request.cidr):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid CIDR format"
         )
-        
-        db.add(entry)
-        await db.commit()
-        
-        # Update network validator
-        # This would need to reload allowlist from database
-        
-        logger.info("Allowlist entry added",
-                   cidr=entry_request.cidr,
-                   created_by=auth.user_id)
-        
-        return {"message": "Allowlist entry added successfully"}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Failed to add allowlist entry", error=str(e))
+    
+    # Check if entry already exists
+    entry_exists = await db.scalar(
+        select(exists().where(AllowlistEntry.cidr == entry_request.cidr))
+    )
+    
+    if entry_exists:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to add allowlist entry"
-        )
\ No newline at end of file
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Allowlist entry already exists"
+        )
+    
+    # Create entry
+    entry = AllowlistEntry(
+        cidr=entry_request.cidr,
+        description=entry_request.description,
+        enabled=entry_request.enabled,
+        entry_type="allow",  # Default to allow
+        created_by=auth.user_id
+    )
+    
+    db.add(entry)
+    if entry.enabled:
+        await notify_allowlist_change(db, entry.cidr, entry.entry_type)
+    await db.commit()
+    await invalidate(ALLOWLIST_CACHE_PREFIX)
+    
+    # Apply locally right away; other workers pick it up from the notification
+    if entry.enabled:
+        network_validator.add_entry(entry.cidr, entry.entry_type)
+    
+    logger.info("Allowlist entry added",
+               cidr=entry_request.cidr,
+               created_by=auth.user_id)
+    
+    return {"message": "Allowlist entry added successfully"}
\ No newline at end of file
@@ -2,10 +2,11 @@
 Common API schemas and models
 """
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, validator, field_validator, ConfigDict, AliasChoices, EmailStr
 from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 from enum import Enum
+import re
 import uuid
 
 
@@ -41,9 +42,27 @@ class UserRole(str, Enum):
     READ_ONLY = "read_only"
 
 
+# Value -> member lookup for building responses from DB strings without
+# going through Enum.__call__
+USER_ROLE_BY_VALUE = {r.value: r for r in UserRole}
+
+# hping3 option prefixes users may pass through
+ALLOWED_HPING_OPTIONS = frozenset({
+    '--fast', '--faster', '--flood',
+    '-V', '--verbose', '-q', '--quiet',
+    '--baseport', '--destport', '--keep'
+})
+# Longest prefixes first so alternation never stops at a shorter match
+_HPING_OPTION_RE = re.compile('|'.join(
+    re.escape(option) for option in sorted(ALLOWED_HPING_OPTIONS, key=len, reverse=True)
+))
+
+
 # Request/Response Schemas
 class JobCreateRequest(BaseModel):
-    """Job creation request schema"""
+    """Job creation request schema (also rebuilt from Job rows for execution)"""
+    model_config = ConfigDict(from_attributes=True)
+    
     name: str = Field(..., min_length=1, max_length=100)
     targets: List[str] = Field(..., min_items=1, max_items=1000)
     target_group: Optional[str] = None
@@ -65,28 +84,26 @@ class JobCreateRequest(BaseModel):
 
     @validator('targets')
     def validate_targets(cls, v):
-        """Validate target format"""
+        """Validate target format and drop duplicates (order preserved)"""
         if not v:
             raise ValueError('At least one target must be specified')
-        return v
+        return list(dict.fromkeys(v))
 
     @validator('hping_options')
     def validate_hping_options(cls, v):
         """Validate hping3 options for safety"""
-        allowed_options = {
-            '--fast', '--faster', '--flood',
-            '-V', '--verbose', '-q', '--quiet',
-            '--baseport', '--destport', '--keep'
-        }
+        match = _HPING_OPTION_RE.match
         for option in v:
-            if not any(option.startswith(allowed) for allowed in allowed_options):
+            if match(option) is None:
                 raise ValueError(f'Hping option not allowed: {option}')
         return v
 
 
 class JobResponse(BaseModel):
-    """Job response schema"""
-    job_id: str
+    """Job response schema (validates straight from Job rows)"""
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+    
+    job_id: str = Field(..., validation_alias=AliasChoices("job_id", "id"))
     name: str
     status: JobStatus
     command: Optional[str] = None
@@ -104,6 +121,10 @@ class JobResponse(BaseModel):
     packets_sent: int = 0
     bytes_sent: int = 0
     error_message: Optional[str] = None
+    
+    @field_validator('packets_sent', 'bytes_sent', mode='before')
+    def zero_if_unset(cls, v):
+        return int(v) if v else 0
 
 
 class JobStopRequest(BaseModel):
@@ -127,25 +148,74 @@ class TargetGroupRequest(BaseModel):
     targets: List[str] = Field(..., min_items=1)
     enabled: bool = True
 
+    @validator('targets')
+    def dedup_targets(cls, v):
+        """Drop duplicate targets, keeping first-seen order"""
+        return list(dict.fromkeys(v))
+
 
 class TargetGroupResponse(BaseModel):
     """Target group response schema"""
+    model_config = ConfigDict(from_attributes=True)
+    
     id: str
     name: str
     description: Optional[str]
     targets: List[str]
     enabled: bool
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class TargetGroupListResponse(BaseModel):
+    """Target group list response schema"""
+    target_groups: List[TargetGroupResponse]
+    total: int
+    page: int
+    per_page: int
+
+
+class TargetGroupColumnarListResponse(BaseModel):
+    """Target group list as parallel column arrays (one entry per row)"""
+    id: List[str]
+    name: List[str]
+    description: List[Optional[str]]
+    targets: List[List[str]]
+    enabled: List[bool]
+    created_at: List[datetime]
+    updated_at: List[Optional[datetime]]
+    total: int
+    page: int
+    per_page: int
 
 
 class AllowlistEntry(BaseModel):
     """Allowlist/denylist entry"""
+    model_config = ConfigDict(from_attributes=True)
+    
     cidr: str
     description: Optional[str] = None
     enabled: bool = True
 
 
+class AllowlistListResponse(BaseModel):
+    """Allowlist list response schema"""
+    entries: List[AllowlistEntry]
+    total: int
+    page: int
+    per_page: int
+
+
+class AllowlistColumnarListResponse(BaseModel):
+    """Allowlist as parallel column arrays (one entry per row)"""
+    cidr: List[str]
+    description: List[Optional[str]]
+    enabled: List[bool]
+    total: int
+    page: int
+    per_page: int
+
+
 class QuotaSettings(BaseModel):
     """User/API key quota settings"""
     max_pps: int = Field(100, ge=1, le=10000)
@@ -156,7 +226,7 @@ class QuotaSettings(BaseModel):
 class UserCreateRequest(BaseModel):
     """User creation request"""
     username: str = Field(..., min_length=3, max_length=50)
-    email: str = Field(..., pattern=r'^[^@]+@[^@]+\.[^@]+$')
+    email: EmailStr
     password: str = Field(..., min_length=8)
     role: UserRole = UserRole.OPERATOR
     quotas: QuotaSettings = Field(default_factory=QuotaSettings)
@@ -174,6 +244,18 @@ class UserResponse(BaseModel):
     quotas: QuotaSettings
 
 
+class PageCursor(BaseModel):
+    """Keyset pagination cursor (timestamp and id of the last row returned)"""
+    ts: datetime
+    id: str
+
+
+class UserListResponse(BaseModel):
+    """User list response schema"""
+    users: List[UserResponse]
+    next_cursor: Optional[PageCursor] = None
+
+
 class ApiKeyCreateRequest(BaseModel):
     """API key creation request"""
     name: str = Field(..., min_length=1, max_length=100)
@@ -242,6 +324,12 @@ class AuditLogResponse(BaseModel):
     user_agent: Optional[str]
 
 
+class AuditLogListResponse(BaseModel):
+    """Audit log list response schema"""
+    audit_logs: List[AuditLogResponse]
+    next_cursor: Optional[PageCursor] = None
+
+
 # Error response schemas
 class ErrorResponse(BaseModel):
     """Standard error response"""
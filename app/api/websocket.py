@@ -1,8 +1,9 @@
 """
 WebSocket endpoints for real-time job monitoring and system events.
 """
-import json
 import asyncio
+import time
+import orjson
 from typing import Dict, Set, List, Optional
 from datetime import datetime
 from uuid import UUID
@@ -23,41 +24,144 @@ config = get_config()
 
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
+# Seconds a single subscriber may take to accept a frame
+SEND_TIMEOUT = 5.0
+
+# Frames buffered per connection; when full the oldest frame is dropped
+OUTBOUND_QUEUE_SIZE = 256
+
+# Message timestamps come from a shared clock string refreshed at this
+# interval instead of formatting a datetime per message
+CLOCK_TICK_INTERVAL = 0.05
+
+
+def _iso_now() -> str:
+    """Current UTC time as ISO-8601 with milliseconds, without a datetime"""
+    t = time.time()
+    s = time.gmtime(t)
+    ms = int((t - int(t)) * 1000)
+    return (
+        f"{s.tm_year:04d}-{s.tm_mon:02d}-{s.tm_mday:02d}"
+        f"T{s.tm_hour:02d}:{s.tm_min:02d}:{s.tm_sec:02d}.{ms:03d}Z"
+    )
+
+
+_NOW_ISO: str = _iso_now()
+
+
+async def clock_tick_loop():
+    """Keep _NOW_ISO current for message timestamps"""
+    global _NOW_ISO
+    while True:
+        try:
+            _NOW_ISO = _iso_now()
+            await asyncio.sleep(CLOCK_TICK_INTERVAL)
+        except asyncio.CancelledError:
+            break
+
+
+# Keep-alive frames as browsers and common clients serialize them; matched
+# verbatim so heartbeats skip JSON parsing
+_PING_FRAMES = frozenset({'{"type":"ping"}', '{"type": "ping"}'})
+
+
+def _parse_client_frame(data: str) -> dict:
+    """Decode a client text frame, short-circuiting bare pings"""
+    if data in _PING_FRAMES:
+        return {"type": "ping"}
+    return orjson.loads(data)
+
+
+# Roles allowed to receive each global message type; other types go to
+# admins and operators
+_ALL_ROLES = frozenset({"admin", "operator", "read_only"})
+_DEFAULT_ELIGIBLE_ROLES = frozenset({"admin", "operator"})
+_ELIGIBLE_ROLES: Dict[str, frozenset] = {
+    "admin_action": frozenset({"admin"}),
+    "user_management": frozenset({"admin"}),
+    "job_status_update": _ALL_ROLES,
+    "system_stats": _ALL_ROLES,
+}
+
 
 class ConnectionManager:
-    """Manages WebSocket connections and broadcasts."""
+    """Manages WebSocket connections and broadcasts.
+    
+    Connection metadata is stored column-wise: each connection gets a small
+    integer id (cid) indexing parallel lists, and subscriber sets hold cids.
+    Slots of closed connections are recycled through a free list.
+    """
+    
+    __slots__ = (
+        "_websockets", "_user_ids", "_usernames", "_roles", "_subscription_types",
+        "_job_ids", "_connected_at", "_queues", "_writers", "_cid_by_websocket",
+        "_free_cids", "job_subscribers", "global_subscribers", "_globals_by_role",
+        "_role_counts"
+    )
     
     def __init__(self):
-        # Map websocket to user info for authorization
-        self.active_connections: Dict[WebSocket, Dict] = {}
-        # Job-specific subscriptions
-        self.job_subscribers: Dict[str, Set[WebSocket]] = {}
-        # Global subscribers for all events
-        self.global_subscribers: Set[WebSocket] = set()
+        # Per-connection columns, indexed by cid (None in free slots)
+        self._websockets: List[Optional[WebSocket]] = []
+        self._user_ids: List[Optional[str]] = []
+        self._usernames: List[Optional[str]] = []
+        self._roles: List[Optional[str]] = []
+        self._subscription_types: List[Optional[str]] = []
+        self._job_ids: List[Optional[str]] = []
+        self._connected_at: List[Optional[datetime]] = []
+        self._queues: List[Optional[asyncio.Queue]] = []
+        self._writers: List[Optional[asyncio.Task]] = []
+        self._cid_by_websocket: Dict[WebSocket, int] = {}
+        self._free_cids: List[int] = []
+        # Job-specific subscriptions (job_id -> cids)
+        self.job_subscribers: Dict[str, Set[int]] = {}
+        # Global subscribers for all events (cids), and the same set by role
+        self.global_subscribers: Set[int] = set()
+        self._globals_by_role: Dict[str, Set[int]] = {role: set() for role in _ALL_ROLES}
+        # Open connections per role, kept current on connect/disconnect
+        self._role_counts: Dict[str, int] = {"admin": 0, "operator": 0, "read_only": 0}
+    
+    def _allocate_cid(self) -> int:
+        """Reuse a free slot or grow every column by one."""
+        if self._free_cids:
+            return self._free_cids.pop()
+        
+        for column in (
+            self._websockets, self._user_ids, self._usernames, self._roles,
+            self._subscription_types, self._job_ids, self._connected_at,
+            self._queues, self._writers
+        ):
+            column.append(None)
+        return len(self._websockets) - 1
         
     async def connect(self, websocket: WebSocket, user: User, subscription_type: str = "global", job_id: Optional[str] = None):
         """Accept a new WebSocket connection."""
         await websocket.accept()
         
         # Store connection metadata
-        connection_info = {
-            "user_id": user.id,
-            "username": user.username,
-            "role": user.role,
-            "subscription_type": subscription_type,
-            "job_id": job_id,
-            "connected_at": datetime.utcnow()
-        }
-        
-        self.active_connections[websocket] = connection_info
+        cid = self._allocate_cid()
+        queue = asyncio.Queue(maxsize=OUTBOUND_QUEUE_SIZE)
+        self._websockets[cid] = websocket
+        self._user_ids[cid] = user.id
+        self._usernames[cid] = user.username
+        self._roles[cid] = user.role
+        self._subscription_types[cid] = subscription_type
+        self._job_ids[cid] = job_id
+        self._connected_at[cid] = datetime.utcnow()
+        self._queues[cid] = queue
+        # Single writer per socket: producers only enqueue, never await sends
+        self._writers[cid] = asyncio.create_task(self._writer_loop(websocket, queue))
+        self._cid_by_websocket[websocket] = cid
+        if user.role in self._role_counts:
+            self._role_counts[user.role] += 1
         
         # Add to appropriate subscriber list
         if subscription_type == "job" and job_id:
             if job_id not in self.job_subscribers:
                 self.job_subscribers[job_id] = set()
-            self.job_subscribers[job_id].add(websocket)
+            self.job_subscribers[job_id].add(cid)
         else:
-            self.global_subscribers.add(websocket)
+            self.global_subscribers.add(cid)
+            self._globals_by_role.setdefault(user.role, set()).add(cid)
             
         logger.info("WebSocket connection established", 
                    user_id=user.id, 
@@ -71,110 +175,108 @@ class ConnectionManager:
             "message": "Connected successfully",
             "subscription_type": subscription_type,
             "job_id": job_id,
-            "server_time": datetime.utcnow().isoformat()
+            "server_time": _NOW_ISO
         })
     
     async def disconnect(self, websocket: WebSocket):
         """Handle WebSocket disconnection."""
-        if websocket not in self.active_connections:
+        cid = self._cid_by_websocket.pop(websocket, None)
+        if cid is None:
             return
-            
-        connection_info = self.active_connections[websocket]
         
         # Remove from subscriber lists
-        if connection_info["subscription_type"] == "job":
-            job_id = connection_info["job_id"]
+        if self._subscription_types[cid] == "job":
+            job_id = self._job_ids[cid]
             if job_id in self.job_subscribers:
-                self.job_subscribers[job_id].discard(websocket)
+                self.job_subscribers[job_id].discard(cid)
                 if not self.job_subscribers[job_id]:
                     del self.job_subscribers[job_id]
         else:
-            self.global_subscribers.discard(websocket)
-            
-        # Remove connection record
-        del self.active_connections[websocket]
+            self.global_subscribers.discard(cid)
+            self._globals_by_role.get(self._roles[cid], set()).discard(cid)
+        
+        role = self._roles[cid]
+        if role in self._role_counts:
+            self._role_counts[role] -= 1
+        
+        writer = self._writers[cid]
+        if writer is not asyncio.current_task():
+            writer.cancel()
         
         logger.info("WebSocket connection closed", 
-                   user_id=connection_info["user_id"],
-                   username=connection_info["username"])
+                   user_id=self._user_ids[cid],
+                   username=self._usernames[cid])
+        
+        # Clear the slot and make it reusable
+        for column in (
+            self._websockets, self._user_ids, self._usernames, self._roles,
+            self._subscription_types, self._job_ids, self._connected_at,
+            self._queues, self._writers
+        ):
+            column[cid] = None
+        self._free_cids.append(cid)
     
     async def send_personal_message(self, websocket: WebSocket, message: dict):
         """Send a message to a specific WebSocket connection."""
+        cid = self._cid_by_websocket.get(websocket)
+        if cid is not None:
+            self._enqueue(cid, orjson.dumps(message).decode())
+    
+    async def _writer_loop(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Drain a connection's outbound queue onto its socket."""
         try:
-            await websocket.send_text(json.dumps(message))
+            while True:
+                payload = await queue.get()
+                await asyncio.wait_for(websocket.send_text(payload), timeout=SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error("Failed to send personal message", error=str(e))
+            logger.error("Failed to send to subscriber", error=str(e) or type(e).__name__)
             await self.disconnect(websocket)
     
+    def _enqueue(self, cid: int, payload: str):
+        """Queue a frame for a connection, dropping its oldest frame if it is behind."""
+        queue = self._queues[cid]
+        if queue.full():
+            queue.get_nowait()
+            logger.warning("Dropped frame for slow WebSocket client", user_id=self._user_ids[cid])
+        queue.put_nowait(payload)
+    
+    async def _fan_out(self, cids: List[int], message: dict):
+        """Queue one frame for every recipient."""
+        if not cids:
+            return
+        
+        # Serialize once; every recipient gets the same frame
+        payload = orjson.dumps(message).decode()
+        for cid in cids:
+            self._enqueue(cid, payload)
+    
     async def broadcast_to_job_subscribers(self, job_id: str, message: dict):
         """Broadcast a message to all subscribers of a specific job."""
         if job_id not in self.job_subscribers:
             return
-            
-        disconnected = []
-        for websocket in self.job_subscribers[job_id]:
-            try:
-                await websocket.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error("Failed to broadcast to job subscriber", 
-                           job_id=job_id, error=str(e))
-                disconnected.append(websocket)
         
-        # Clean up disconnected websockets
-        for websocket in disconnected:
-            await self.disconnect(websocket)
+        await self._fan_out(list(self.job_subscribers[job_id]), message)
     
     async def broadcast_to_global_subscribers(self, message: dict):
         """Broadcast a message to all global subscribers."""
-        disconnected = []
-        for websocket in self.global_subscribers:
-            try:
-                # Check if user has permission for this message type
-                connection_info = self.active_connections[websocket]
-                if self._user_can_receive_message(connection_info, message):
-                    await websocket.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error("Failed to broadcast to global subscriber", error=str(e))
-                disconnected.append(websocket)
-        
-        # Clean up disconnected websockets
-        for websocket in disconnected:
-            await self.disconnect(websocket)
-    
-    def _user_can_receive_message(self, connection_info: dict, message: dict) -> bool:
-        """Check if user has permission to receive a specific message."""
-        user_role = connection_info["role"]
-        message_type = message.get("type", "")
-        
-        # Admin can see everything
-        if user_role == "admin":
-            return True
-            
-        # Operators can see job events but not admin events
-        if user_role == "operator":
-            return message_type not in ["admin_action", "user_management"]
-            
-        # Read-only users can only see job status updates for jobs they can view
-        if user_role == "read_only":
-            return message_type in ["job_status_update", "system_stats"]
-            
-        return False
+        eligible_roles = _ELIGIBLE_ROLES.get(message.get("type", ""), _DEFAULT_ELIGIBLE_ROLES)
+        recipients = [
+            cid
+            for role in eligible_roles
+            for cid in self._globals_by_role.get(role, ())
+        ]
+        await self._fan_out(recipients, message)
     
     def get_connection_stats(self) -> dict:
-        """Get statistics about active connections."""
-        stats = {
-            "total_connections": len(self.active_connections),
+        """Get statistics about active connections (O(1), from running counters)."""
+        return {
+            "total_connections": len(self._cid_by_websocket),
             "global_subscribers": len(self.global_subscribers),
             "job_subscriptions": len(self.job_subscribers),
-            "connections_by_role": {"admin": 0, "operator": 0, "read_only": 0}
+            "connections_by_role": dict(self._role_counts)
         }
-        
-        for connection_info in self.active_connections.values():
-            role = connection_info["role"]
-            if role in stats["connections_by_role"]:
-                stats["connections_by_role"][role] += 1
-                
-        return stats
 
 
 # Global connection manager instance
@@ -193,12 +295,12 @@ async def websocket_global_monitor(
         while True:
             # Keep connection alive and handle ping/pong
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = _parse_client_frame(data)
             
             if message.get("type") == "ping":
                 await manager.send_personal_message(websocket, {
                     "type": "pong",
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": _NOW_ISO
                 })
             elif message.get("type") == "request_stats":
                 # Send current system stats
@@ -206,7 +308,7 @@ async def websocket_global_monitor(
                 await manager.send_personal_message(websocket, {
                     "type": "system_stats",
                     "data": stats,
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": _NOW_ISO
                 })
                 
     except WebSocketDisconnect:
@@ -253,18 +355,18 @@ async def websocket_job_monitor(
                 "completed_at": job.completed_at.isoformat() if job.completed_at else None,
                 "pid": job.pid
             },
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": _NOW_ISO
         })
         
         while True:
             # Keep connection alive
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = _parse_client_frame(data)
             
             if message.get("type") == "ping":
                 await manager.send_personal_message(websocket, {
                     "type": "pong",
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": _NOW_ISO
                 })
                 
     except WebSocketDisconnect:
@@ -289,7 +391,7 @@ async def broadcast_job_update(job: Job):
             "completed_at": job.completed_at.isoformat() if job.completed_at else None,
             "pid": job.pid
         },
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": _NOW_ISO
     }
     
     # Broadcast to job-specific subscribers
@@ -306,7 +408,7 @@ async def broadcast_system_event(event_type: str, data: dict, level: str = "info
         "event_type": event_type,
         "level": level,
         "data": data,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": _NOW_ISO
     }
     
     await manager.broadcast_to_global_subscribers(message)
@@ -319,7 +421,7 @@ async def broadcast_admin_action(action: str, details: dict, user_id: int):
         "action": action,
         "details": details,
         "performed_by": user_id,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": _NOW_ISO
     }
     
     await manager.broadcast_to_global_subscribers(message)
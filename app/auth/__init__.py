@@ -5,6 +5,7 @@ Authentication package initialization
 from app.auth.security import (
     hash_password,
     verify_password,
+    dummy_verify_password,
     create_access_token,
     decode_access_token,
     generate_api_key,
@@ -15,6 +16,10 @@ from app.auth.security import (
 from app.auth.dependencies import (
     AuthContext,
     get_auth_context,
+    cache_api_key,
+    uncache_api_key,
+    uncache_user_api_keys,
+    forget_user_tokens,
     require_role,
     require_scope,
     RequireAuth,
@@ -30,6 +35,7 @@ from app.auth.dependencies import (
 __all__ = [
     "hash_password",
     "verify_password", 
+    "dummy_verify_password",
     "create_access_token",
     "decode_access_token",
     "generate_api_key",
@@ -37,6 +43,10 @@ __all__ = [
     "verify_api_key",
     "AuthContext",
     "get_auth_context",
+    "cache_api_key",
+    "uncache_api_key",
+    "uncache_user_api_keys",
+    "forget_user_tokens",
     "require_role",
     "require_scope",
     "RequireAuth",
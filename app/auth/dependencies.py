@@ -5,24 +5,47 @@ Authentication dependencies and middleware
 from fastapi import Depends, HTTPException, status, Request, WebSocket, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Optional, List
-from datetime import datetime
+from sqlalchemy import select, update, case, lambda_stmt
+from sqlalchemy.orm import contains_eager
+from typing import Optional, List, Dict
+from datetime import datetime, timezone
+from cachetools import TTLCache
+import asyncio
+import hashlib
+import orjson
+import time
 import structlog
 
-from app.db.database import get_db
+from app.db.database import get_db, AsyncSessionLocal
+from app.db.redis import get_redis
 from app.models.user import User, ApiKey
-from app.auth.security import decode_access_token, verify_api_key
+from app.auth.security import decode_access_token, hash_api_key, legacy_hash_api_key
 from app.api.schemas import UserRole
+from app.config import settings
 
 logger = structlog.get_logger()
 
+API_KEY_CACHE_PREFIX = "apikey:"
+
 # Security scheme for JWT tokens
 security = HTTPBearer()
 
+# API key id -> most recent use, waiting to be written back
+_last_used_pending: Dict[str, datetime] = {}
+
+# blake2b(token) -> (exp, user snapshot) for recently verified JWTs
+_token_cache: TTLCache = TTLCache(maxsize=settings.jwt_cache_size, ttl=settings.jwt_cache_ttl)
+
+# WebSocket credential -> (user id, token exp or key expires_at, API key id)
+# so reconnects skip verification;
+# API keys are keyed by their stored hash, tokens by blake2b(token)
+_ws_auth_cache: TTLCache = TTLCache(maxsize=5000, ttl=settings.ws_auth_cache_ttl)
+
 
 class AuthContext:
     """Authentication context containing user/API key info"""
+    __slots__ = ("user", "api_key", "scopes")
+    
     def __init__(
         self,
         user: Optional[User] = None,
@@ -61,12 +84,194 @@ class AuthContext:
         return {}
 
 
+async def cache_api_key(key_record: ApiKey, role: str):
+    """Cache a validated API key in Redis, keyed by its hash"""
+    redis = get_redis()
+    if redis is None:
+        return
+    
+    expires_at = key_record.expires_at
+    now = datetime.now(expires_at.tzinfo) if expires_at.tzinfo else datetime.utcnow()
+    ttl = min(settings.api_key_cache_ttl, int((expires_at - now).total_seconds()))
+    if ttl <= 0:
+        return
+    
+    payload = {
+        "id": key_record.id,
+        "user_id": key_record.user_id,
+        "role": role,
+        "scopes": key_record.scopes,
+        "quotas": key_record.quotas,
+        "expires_at": expires_at.isoformat()
+    }
+    
+    try:
+        await redis.set(API_KEY_CACHE_PREFIX + key_record.key_hash, orjson.dumps(payload), ex=ttl)
+    except Exception as e:
+        logger.warning("Failed to cache API key", api_key_id=key_record.id, error=str(e))
+
+
+async def uncache_api_key(key_hash: str):
+    """Remove an API key from the Redis cache"""
+    _ws_auth_cache.pop(key_hash, None)
+    
+    redis = get_redis()
+    if redis is None:
+        return
+    
+    try:
+        await redis.delete(API_KEY_CACHE_PREFIX + key_hash)
+    except Exception as e:
+        logger.warning("Failed to evict cached API key", error=str(e))
+
+
+async def uncache_user_api_keys(db: AsyncSession, user_id: str):
+    """Remove every API key of a user from the caches (e.g. on disable)
+    
+    Cache hits trust the owner's enabled state captured when the key was
+    cached, so disabling a user must evict their keys explicitly.
+    """
+    result = await db.execute(select(ApiKey.key_hash).where(ApiKey.user_id == user_id))
+    key_hashes = list(result.scalars().all())
+    if not key_hashes:
+        return
+    
+    for key_hash in key_hashes:
+        _ws_auth_cache.pop(key_hash, None)
+    
+    redis = get_redis()
+    if redis is None:
+        return
+    
+    try:
+        await redis.delete(*(API_KEY_CACHE_PREFIX + key_hash for key_hash in key_hashes))
+    except Exception as e:
+        logger.warning("Failed to evict cached API keys", user_id=user_id, error=str(e))
+
+
+async def _get_cached_api_key(key_hash: str) -> Optional[ApiKey]:
+    """Build a detached ApiKey from the Redis cache, or None on a miss"""
+    redis = get_redis()
+    if redis is None:
+        return None
+    
+    try:
+        cached = await redis.get(API_KEY_CACHE_PREFIX + key_hash)
+    except Exception as e:
+        logger.warning("Failed to read API key cache", error=str(e))
+        return None
+    
+    if not cached:
+        return None
+    
+    data = orjson.loads(cached)
+    return ApiKey(
+        id=data["id"],
+        user_id=data["user_id"],
+        key_hash=key_hash,
+        scopes=data["scopes"],
+        quotas=data["quotas"],
+        enabled=True,
+        expires_at=datetime.fromisoformat(data["expires_at"]),
+        user=User(id=data["user_id"], role=data["role"], enabled=True)
+    )
+
+
+def mark_api_key_used(api_key_id: str):
+    """Record an API key use; persisted by the next last_used flush"""
+    _last_used_pending[api_key_id] = datetime.utcnow()
+
+
+async def flush_api_key_last_used():
+    """Write buffered last_used timestamps in a single UPDATE"""
+    if not _last_used_pending:
+        return
+    
+    pending = _last_used_pending.copy()
+    _last_used_pending.clear()
+    
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(ApiKey)
+                .where(ApiKey.id.in_(pending.keys()))
+                .values(last_used=case(pending, value=ApiKey.id))
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error("Failed to flush API key last_used", keys=len(pending), error=str(e))
+        # Keep newer timestamps recorded while the flush was running
+        for api_key_id, used_at in pending.items():
+            _last_used_pending.setdefault(api_key_id, used_at)
+
+
+async def api_key_last_used_loop():
+    """Periodically flush buffered API key last_used timestamps"""
+    while True:
+        try:
+            await asyncio.sleep(settings.api_key_last_used_flush_interval)
+            await flush_api_key_last_used()
+        except asyncio.CancelledError:
+            break
+
+
+async def _lookup_api_key(db: AsyncSession, key_hash: str) -> Optional[ApiKey]:
+    """Fetch the enabled key (with its enabled owner) by its unique hash
+    
+    The User join used for the enabled filter also populates ApiKey.user
+    (contains_eager), so AuthContext.role never triggers a lazy load.
+    """
+    result = await db.execute(
+        select(ApiKey)
+        .join(User)
+        .options(contains_eager(ApiKey.user))
+        .where(
+            ApiKey.key_hash == key_hash,
+            ApiKey.enabled == True,
+            User.enabled == True
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def _find_api_key(db: AsyncSession, api_key: str, key_hash: str) -> Optional[ApiKey]:
+    """Look up an API key, upgrading a pre-HMAC SHA-256 hash on first use"""
+    key_record = await _lookup_api_key(db, key_hash)
+    if key_record:
+        return key_record
+    
+    key_record = await _lookup_api_key(db, legacy_hash_api_key(api_key))
+    if key_record:
+        key_record.key_hash = key_hash
+        await db.commit()
+        logger.info("Upgraded API key hash to HMAC", api_key_id=key_record.id)
+    
+    return key_record
+
+
+def forget_user_tokens(user_id: str):
+    """Drop cached JWT lookups for a user (after disabling or changing them)"""
+    for token_key, (_, snapshot) in list(_token_cache.items()):
+        if snapshot["id"] == user_id:
+            _token_cache.pop(token_key, None)
+
+
 async def get_current_user_from_token(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
 ) -> Optional[User]:
-    """Get current user from JWT token"""
+    """Get current user from JWT token
+    
+    Verified tokens are cached for settings.jwt_cache_ttl seconds (never
+    past their exp), skipping signature checks and the user query.
+    """
     token = credentials.credentials
+    token_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    
+    cached = _token_cache.get(token_key)
+    if cached and cached[0] > time.time():
+        return User(**cached[1])
+    
     payload = decode_access_token(token)
     
     if not payload:
@@ -76,46 +281,69 @@ async def get_current_user_from_token(
     if not user_id:
         return None
         
-    result = await db.execute(select(User).where(User.id == user_id, User.enabled == True))
+    result = await db.execute(
+        lambda_stmt(lambda: select(User).where(User.id == user_id, User.enabled == True))
+    )
     user = result.scalar_one_or_none()
     
     if user:
         logger.info("User authenticated via JWT", user_id=user.id, username=user.username)
+        _token_cache[token_key] = (payload.get("exp", 0), {
+            "id": user.id,
+            "username": user.username,
+            "role": user.role,
+            "enabled": user.enabled,
+            "quotas": user.quotas
+        })
     
     return user
 
 
+def _extract_api_key(request: Request) -> Optional[str]:
+    """Read X-API-Key straight from the raw ASGI header list
+    
+    Skips building Starlette's case-insensitive Headers view; ASGI servers
+    already deliver header names lowercased.
+    """
+    for name, value in request.scope["headers"]:
+        if name == b"x-api-key":
+            return value.decode("latin-1")
+    return None
+
+
 async def get_current_user_from_api_key(
     request: Request,
     db: AsyncSession = Depends(get_db)
 ) -> Optional[ApiKey]:
     """Get current user from API key header"""
-    api_key = request.headers.get("X-API-Key")
+    api_key = _extract_api_key(request)
     if not api_key:
         return None
+    
+    key_hash = hash_api_key(api_key)
+    
+    # Serve recently validated keys from Redis without touching the database
+    cached_key = await _get_cached_api_key(key_hash)
+    if cached_key:
+        mark_api_key_used(cached_key.id)
+        return cached_key
         
-    # Find API key in database
-    result = await db.execute(
-        select(ApiKey)
-        .where(ApiKey.enabled == True)
-        .join(User)
-        .where(User.enabled == True)
-    )
+    # Keys are stored as a deterministic HMAC, so the unique index finds
+    # the one candidate row directly
+    key_record = await _find_api_key(db, api_key, key_hash)
+    if not key_record:
+        return None
     
-    for key_record in result.scalars():
-        if verify_api_key(api_key, key_record.key_hash):
-            # Update last used timestamp
-            key_record.last_used = datetime.utcnow()
-            await db.commit()
-            
-            logger.info(
-                "User authenticated via API key", 
-                api_key_id=key_record.id, 
-                user_id=key_record.user_id
-            )
-            return key_record
+    mark_api_key_used(key_record.id)
     
-    return None
+    logger.info(
+        "User authenticated via API key", 
+        api_key_id=key_record.id, 
+        user_id=key_record.user_id
+    )
+    
+    await cache_api_key(key_record, key_record.user.role)
+    return key_record
 
 
 async def get_auth_context(
@@ -195,40 +423,72 @@ def require_scope(required_scope: str):
 
 
 # WebSocket authentication
+def _api_key_expired(expires_at: Optional[datetime]) -> bool:
+    """Check an API key's expires_at (naive values are UTC)"""
+    if expires_at is None:
+        return False
+    if expires_at.tzinfo is not None:
+        return expires_at <= datetime.now(timezone.utc)
+    return expires_at <= datetime.utcnow()
+
+
 async def get_current_user_websocket(
     websocket: WebSocket,
     token: Optional[str] = Query(None),
     api_key: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db)
 ) -> User:
-    """Authenticate user for WebSocket connections using query parameters"""
+    """Authenticate user for WebSocket connections using query parameters
+    
+    Credentials verified within the last settings.ws_auth_cache_ttl seconds
+    resolve straight to their user id, so a reconnect costs one primary-key
+    fetch.
+    """
     user = None
     
     # Try JWT token first
     if token:
-        payload = decode_access_token(token)
-        if payload:
-            user_id = payload.get("sub")
-            if user_id:
-                result = await db.execute(select(User).where(User.id == user_id, User.enabled == True))
-                user = result.scalar_one_or_none()
+        cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        cached = _ws_auth_cache.get(cache_key)
+        if cached and cached[1] > time.time():
+            user = await db.get(User, cached[0])
+        else:
+            payload = decode_access_token(token)
+            if payload:
+                user_id = payload.get("sub")
+                if user_id:
+                    result = await db.execute(
+                        lambda_stmt(lambda: select(User).where(User.id == user_id, User.enabled == True))
+                    )
+                    user = result.scalar_one_or_none()
+                    if user:
+                        _ws_auth_cache[cache_key] = (user.id, payload.get("exp", 0), None)
     
     # Try API key if no JWT
     if not user and api_key:
-        result = await db.execute(
-            select(ApiKey)
-            .where(ApiKey.enabled == True)
-            .join(User)
-            .where(User.enabled == True)
-        )
-        
-        for key_record in result.scalars():
-            if verify_api_key(api_key, key_record.key_hash):
-                # Update last used timestamp
-                key_record.last_used = datetime.utcnow()
-                await db.commit()
+        key_hash = hash_api_key(api_key)
+        cached = _ws_auth_cache.get(key_hash)
+        if cached:
+            # Revocation on another worker never reaches this cache, so the
+            # key row is re-checked by primary key on every hit
+            key_record = None
+            if not _api_key_expired(cached[1]):
+                key_record = await db.get(ApiKey, cached[2])
+            if key_record and key_record.enabled and key_record.key_hash == key_hash:
+                mark_api_key_used(key_record.id)
+                user = await db.get(User, key_record.user_id)
+            else:
+                _ws_auth_cache.pop(key_hash, None)
+        else:
+            key_record = await _find_api_key(db, api_key, key_hash)
+            if key_record and not _api_key_expired(key_record.expires_at):
+                mark_api_key_used(key_record.id)
                 user = key_record.user
-                break
+                _ws_auth_cache[key_hash] = (user.id, key_record.expires_at, key_record.id)
+    
+    # A cached credential may outlive its owner's account
+    if user and not user.enabled:
+        user = None
     
     if not user:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid authentication")
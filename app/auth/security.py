@@ -8,6 +8,7 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 import secrets
 import hashlib
+import hmac
 
 from app.config import settings
 
@@ -25,6 +26,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def dummy_verify_password() -> bool:
+    """Spend one verification's worth of work without a real hash (timing equalization)"""
+    return pwd_context.dummy_verify()
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -54,10 +60,20 @@ def generate_api_key() -> str:
 
 
 def hash_api_key(api_key: str) -> str:
-    """Hash an API key for secure storage"""
+    """Hash an API key for secure storage
+    
+    API keys are 256-bit random tokens, so a keyed HMAC-SHA256 is sufficient;
+    a slow password KDF is not needed. The HMAC secret lives outside the
+    database, so a leaked key_hash column cannot be checked offline.
+    """
+    return hmac.new(settings.api_key_hmac_secret.encode(), api_key.encode(), hashlib.sha256).hexdigest()
+
+
+def legacy_hash_api_key(api_key: str) -> str:
+    """Unkeyed SHA-256 used for API keys issued before HMAC hashing"""
     return hashlib.sha256(api_key.encode()).hexdigest()
 
 
 def verify_api_key(api_key: str, hashed_key: str) -> bool:
-    """Verify an API key against its hash"""
-    return hash_api_key(api_key) == hashed_key
\ No newline at end of file
+    """Verify an API key against its hash in constant time"""
+    return hmac.compare_digest(hash_api_key(api_key), hashed_key)
\ No newline at end of file
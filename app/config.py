@@ -5,48 +5,97 @@ A secure, web-based tool for orchestrating controlled hping3 traffic generation
 with comprehensive monitoring, RBAC, and safety controls.
 """
 
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Optional, Tuple
 import os
 
 
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() == "true"
+
+
+@dataclass(frozen=True, slots=True)
 class Settings:
-    """Application configuration settings"""
-    
-    def __init__(self):
-        # Application
-        self.app_name: str = "StormForge Traffic Orchestrator"
-        self.app_version: str = "1.0.0"
-        self.debug: bool = os.getenv("DEBUG", "false").lower() == "true"
-        
-        # API
-        self.api_prefix: str = "/api/v1"
-        self.cors_origins: List[str] = ["*"]
-        
-        # Security
-        self.secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
-        self.algorithm: str = "HS256"
-        self.access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-        self.api_key_expire_days: int = 365
-        
-        # Database
-        self.database_url: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./data/orchestrator.db")
-        self.database_echo: bool = os.getenv("DATABASE_ECHO", "false").lower() == "true"
-        
-        # Hping3
-        self.hping3_path: str = os.getenv("HPING3_PATH", "/usr/sbin/hping3")
-        self.max_concurrent_jobs: int = int(os.getenv("MAX_CONCURRENT_JOBS", "10"))
-        self.default_timeout: int = int(os.getenv("DEFAULT_TIMEOUT", "30"))
-        self.max_targets_per_job: int = 100
-        
-        # Logging
-        self.log_level: str = os.getenv("LOG_LEVEL", "INFO")
-        self.log_format: str = os.getenv("LOG_FORMAT", "json")
-        
-        # Network Security
-        self.default_blocked_ranges: List[str] = ["127.0.0.0/8", "169.254.0.0/16", "224.0.0.0/4", "0.0.0.0/8", "240.0.0.0/4"]
-        self.default_allowlist: List[str] = ["192.168.0.0/16", "10.0.0.0/8", "172.16.0.0/12"]
-        self.default_denylist: List[str] = ["127.0.0.0/8", "169.254.0.0/16", "224.0.0.0/4"]
-        self.allowed_broadcast_ranges: List[str] = ["192.168.0.0/16", "10.0.0.0/8", "172.16.0.0/12"]
+    """Application configuration settings (read from the environment once, at import)"""
+    
+    # Application
+    app_name: str = "StormForge Traffic Orchestrator"
+    app_version: str = "1.0.0"
+    debug: bool = _env_bool("DEBUG", False)
+    
+    # Server
+    host: str = os.getenv("HOST", "0.0.0.0")
+    port: int = _env_int("PORT", 8000)
+    workers: int = _env_int("WORKERS", 1)
+    event_loop: str = os.getenv("EVENT_LOOP", "uvloop")
+    ws_per_message_deflate: bool = _env_bool("WS_PER_MESSAGE_DEFLATE", True)
+    
+    # API
+    api_prefix: str = "/api/v1"
+    cors_origins: Tuple[str, ...] = ("*",)
+    
+    # Security
+    secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = _env_int("ACCESS_TOKEN_EXPIRE_MINUTES", 30)
+    jwt_cache_size: int = _env_int("JWT_CACHE_SIZE", 10000)
+    jwt_cache_ttl: int = _env_int("JWT_CACHE_TTL", 60)
+    ws_auth_cache_ttl: int = _env_int("WS_AUTH_CACHE_TTL", 300)
+    api_key_expire_days: int = 365
+    api_key_hmac_secret: str = os.getenv("API_KEY_HMAC_SECRET", secret_key)
+    
+    # Database
+    database_url: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./data/orchestrator.db")
+    database_echo: bool = _env_bool("DATABASE_ECHO", False)
+    db_pool_size: int = _env_int("DB_POOL_SIZE", 20)
+    db_max_overflow: int = _env_int("DB_MAX_OVERFLOW", 40)
+    db_pool_timeout: int = _env_int("DB_POOL_TIMEOUT", 30)
+    db_pool_recycle: int = _env_int("DB_POOL_RECYCLE", 3600)
+    db_query_cache_size: int = _env_int("DB_QUERY_CACHE_SIZE", 1200)
+    db_sqlite_busy_timeout: int = _env_int("DB_SQLITE_BUSY_TIMEOUT", 30)
+    db_pgbouncer: bool = _env_bool("DB_PGBOUNCER", False)
+    
+    # Redis (optional, used for response caching)
+    redis_url: Optional[str] = os.getenv("REDIS_URL")
+    system_stats_cache_ttl: int = _env_int("SYSTEM_STATS_CACHE_TTL", 15)
+    system_stats_refresh_interval: int = _env_int("SYSTEM_STATS_REFRESH_INTERVAL", 300)
+    api_key_cache_ttl: int = _env_int("API_KEY_CACHE_TTL", 300)
+    api_key_last_used_flush_interval: int = _env_int("API_KEY_LAST_USED_FLUSH_INTERVAL", 30)
+    
+    # Audit logs
+    audit_log_default_window_days: int = _env_int("AUDIT_LOG_DEFAULT_WINDOW_DAYS", 90)
+    audit_log_retention_days: int = _env_int("AUDIT_LOG_RETENTION_DAYS", 0)
+    
+    # Hping3
+    hping3_path: str = os.getenv("HPING3_PATH", "/usr/sbin/hping3")
+    max_concurrent_jobs: int = _env_int("MAX_CONCURRENT_JOBS", 10)
+    default_timeout: int = _env_int("DEFAULT_TIMEOUT", 30)
+    
+    # Safety & Limits (quota defaults when a user/API key sets none)
+    default_max_pps: int = _env_int("DEFAULT_MAX_PPS", 100)
+    default_max_concurrent_jobs: int = _env_int("DEFAULT_MAX_CONCURRENT_JOBS", 5)
+    default_max_job_duration: int = _env_int("DEFAULT_MAX_JOB_DURATION", 3600)
+    global_max_pps: int = _env_int("GLOBAL_MAX_PPS", 10000)
+    global_max_concurrent_jobs: int = _env_int("GLOBAL_MAX_CONCURRENT_JOBS", 50)
+    max_targets_per_job: int = 100
+    # Stats refresh interval while jobs run; idle monitoring sleeps until a
+    # job starts or exits
+    process_check_interval: int = _env_int("PROCESS_CHECK_INTERVAL", 1)
+    zombie_cleanup_interval: int = _env_int("ZOMBIE_CLEANUP_INTERVAL", 30)
+    
+    # Logging
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_format: str = os.getenv("LOG_FORMAT", "json")
+    
+    # Network Security
+    default_blocked_ranges: Tuple[str, ...] = ("127.0.0.0/8", "169.254.0.0/16", "224.0.0.0/4", "0.0.0.0/8", "240.0.0.0/4")
+    default_allowlist: Tuple[str, ...] = ("192.168.0.0/16", "10.0.0.0/8", "172.16.0.0/12")
+    default_denylist: Tuple[str, ...] = ("127.0.0.0/8", "169.254.0.0/16", "224.0.0.0/4")
+    allowed_broadcast_ranges: Tuple[str, ...] = ("192.168.0.0/16", "10.0.0.0/8", "172.16.0.0/12")
 
 
 # Global settings instance
@@ -0,0 +1,79 @@
+"""
+Cross-worker allowlist change notifications (PostgreSQL LISTEN/NOTIFY)
+"""
+
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import orjson
+import structlog
+
+from app.config import settings
+from app.db.database import engine, AsyncSessionLocal
+from app.utils.validation import network_validator
+
+logger = structlog.get_logger()
+
+ALLOWLIST_CHANNEL = "allowlist_changed"
+
+# Delay before re-establishing a dropped listener connection
+LISTENER_RETRY_INTERVAL = 5
+
+_NOTIFY = text(f"SELECT pg_notify('{ALLOWLIST_CHANNEL}', :payload)")
+
+
+def notifications_supported() -> bool:
+    """LISTEN needs asyncpg on a session-pinned connection (not PgBouncer transaction mode)"""
+    return (
+        engine.dialect.name == "postgresql"
+        and engine.dialect.driver == "asyncpg"
+        and not settings.db_pgbouncer
+    )
+
+
+async def notify_allowlist_change(db: AsyncSession, cidr: str, entry_type: str):
+    """Queue a change notification; PostgreSQL delivers it when the transaction commits"""
+    if db.bind.dialect.name != "postgresql":
+        return
+    
+    payload = orjson.dumps({"cidr": cidr, "entry_type": entry_type}).decode()
+    await db.execute(_NOTIFY, {"payload": payload})
+
+
+def _on_notification(connection, pid, channel, payload):
+    """asyncpg listener callback: apply the change to this worker's validator"""
+    try:
+        change = orjson.loads(payload)
+        network_validator.add_entry(change["cidr"], change["entry_type"])
+    except Exception as e:
+        logger.warning("Ignoring malformed allowlist notification", payload=payload, error=str(e))
+
+
+async def allowlist_listener_loop():
+    """Hold a dedicated connection LISTENing for allowlist changes from any worker"""
+    if not notifications_supported():
+        return
+    
+    while True:
+        try:
+            async with engine.connect() as conn:
+                raw = await conn.get_raw_connection()
+                driver_conn = raw.driver_connection
+                await driver_conn.add_listener(ALLOWLIST_CHANNEL, _on_notification)
+                
+                # Changes may have been missed while disconnected
+                async with AsyncSessionLocal() as db:
+                    await network_validator.reload(db)
+                
+                try:
+                    while not driver_conn.is_closed():
+                        await asyncio.sleep(LISTENER_RETRY_INTERVAL)
+                finally:
+                    if not driver_conn.is_closed():
+                        await driver_conn.remove_listener(ALLOWLIST_CHANNEL, _on_notification)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error("Allowlist listener failed", error=str(e))
+        
+        await asyncio.sleep(LISTENER_RETRY_INTERVAL)
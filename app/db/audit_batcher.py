@@ -0,0 +1,135 @@
+"""
+Buffered audit log writer that flushes rows in batches
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+import orjson
+from sqlalchemy import insert
+import structlog
+
+from app.models.audit_log import AuditLog
+
+logger = structlog.get_logger()
+
+_AUDIT_COLUMNS = (
+    "id", "user_id", "api_key_id", "action", "resource_type", "resource_id",
+    "details", "ip_address", "user_agent", "request_id", "timestamp"
+)
+
+
+class AuditLogBatcher:
+    """Queue audit rows in memory and write them in batches
+    
+    On asyncpg the batch goes through COPY; other drivers fall back to a
+    single executemany INSERT.
+    """
+    
+    def __init__(self, max_batch: int = 500, flush_interval: float = 0.1):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+    
+    def put(self, row: Dict[str, Any]):
+        """Queue an audit row (keys are AuditLog column names)"""
+        self._queue.put_nowait(row)
+    
+    def start(self):
+        """Start the background flush task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the flush task and write any remaining rows"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        while not self._queue.empty():
+            await self._flush(self._drain(self.max_batch))
+    
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        """Pop up to `limit` rows that are already queued"""
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+    
+    async def _run(self):
+        """Collect up to max_batch rows or flush_interval seconds, then flush"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.flush_interval
+                
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                
+                await self._flush(batch)
+            except asyncio.CancelledError:
+                # Put the pending batch back so stop() can write it
+                for row in batch:
+                    self._queue.put_nowait(row)
+                raise
+    
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        """Write a batch of audit rows
+        
+        A failed batch is split in half and each half retried, so a single
+        bad row only loses itself rather than the whole batch.
+        """
+        if not batch:
+            return
+        
+        try:
+            await self._write(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error("Failed to write audit log row", row=batch[0], error=str(e))
+                return
+            
+            logger.warning("Failed to write audit log batch, splitting", rows=len(batch), error=str(e))
+            middle = len(batch) // 2
+            await self._flush(batch[:middle])
+            await self._flush(batch[middle:])
+    
+    async def _write(self, batch: List[Dict[str, Any]]):
+        """Write rows in one transaction (COPY on asyncpg, executemany elsewhere)"""
+        from app.db.database import engine
+        
+        async with engine.begin() as conn:
+            if engine.dialect.driver == "asyncpg":
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    AuditLog.__tablename__,
+                    records=[self._to_record(row) for row in batch],
+                    columns=_AUDIT_COLUMNS
+                )
+            else:
+                await conn.execute(insert(AuditLog), batch)
+    
+    @staticmethod
+    def _to_record(row: Dict[str, Any]) -> tuple:
+        """Convert a row dict into a COPY record in _AUDIT_COLUMNS order"""
+        details = row.get("details")
+        return tuple(
+            orjson.dumps(details).decode() if name == "details" and details is not None else row.get(name)
+            for name in _AUDIT_COLUMNS
+        )
+
+
+# Global audit batcher instance
+audit_batcher = AuditLogBatcher()
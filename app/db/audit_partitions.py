@@ -0,0 +1,133 @@
+"""
+Monthly range partitions for the audit_logs table (PostgreSQL only)
+"""
+
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+AUDIT_LOGS_TABLE = "audit_logs"
+
+# How often to pre-create upcoming partitions and drop expired ones
+PARTITION_MAINTENANCE_INTERVAL = 24 * 3600
+
+_PARTITION_NAME_RE = re.compile(rf"^{AUDIT_LOGS_TABLE}_(\d{{4}})_(\d{{2}})$")
+
+_IS_PARTITIONED = text(
+    "SELECT c.relkind = 'p' FROM pg_class c "
+    "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+)
+
+_LIST_PARTITIONS = text(
+    "SELECT c.relname FROM pg_inherits i "
+    "JOIN pg_class c ON c.oid = i.inhrelid "
+    "JOIN pg_class p ON p.oid = i.inhparent "
+    "WHERE p.relname = :table"
+)
+
+
+def partitioning_supported(dialect_name: str) -> bool:
+    """Check if the database dialect supports declarative partitioning"""
+    return dialect_name == "postgresql"
+
+
+def _month_start(value: datetime) -> datetime:
+    """Truncate a datetime to the first instant of its month (UTC)"""
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month_start: datetime) -> datetime:
+    """Get the first instant of the following month"""
+    return _month_start(month_start + timedelta(days=32))
+
+
+def _partition_name(month_start: datetime) -> str:
+    """Get the partition table name for a month"""
+    return f"{AUDIT_LOGS_TABLE}_{month_start:%Y_%m}"
+
+
+async def _is_partitioned(conn: AsyncConnection) -> bool:
+    """Check if audit_logs was created as a partitioned table"""
+    result = await conn.execute(_IS_PARTITIONED, {"table": AUDIT_LOGS_TABLE})
+    return bool(result.scalar())
+
+
+async def create_audit_log_partitions(conn: AsyncConnection, months_ahead: int = 1):
+    """Create the default partition plus this month's and upcoming partitions"""
+    if not partitioning_supported(conn.dialect.name):
+        return
+    
+    if not await _is_partitioned(conn):
+        logger.warning("audit_logs is not partitioned; skipping partition maintenance")
+        return
+    
+    await conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {AUDIT_LOGS_TABLE}_default "
+        f"PARTITION OF {AUDIT_LOGS_TABLE} DEFAULT"
+    ))
+    
+    month = _month_start(datetime.now(timezone.utc))
+    for _ in range(months_ahead + 1):
+        upper = _next_month(month)
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} "
+            f"PARTITION OF {AUDIT_LOGS_TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        ))
+        month = upper
+
+
+async def drop_expired_audit_log_partitions(conn: AsyncConnection) -> int:
+    """Drop monthly partitions that lie entirely outside the retention window"""
+    if settings.audit_log_retention_days <= 0:
+        return 0
+    
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.audit_log_retention_days)
+    result = await conn.execute(_LIST_PARTITIONS, {"table": AUDIT_LOGS_TABLE})
+    
+    dropped = 0
+    for (name,) in result:
+        match = _PARTITION_NAME_RE.match(name)
+        if not match:
+            continue
+        
+        month = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+        if _next_month(month) <= cutoff:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            logger.info("Dropped expired audit log partition", partition=name)
+            dropped += 1
+    
+    return dropped
+
+
+async def maintain_audit_log_partitions():
+    """Pre-create upcoming audit log partitions and drop expired ones"""
+    from app.db.database import engine
+    
+    if not partitioning_supported(engine.dialect.name):
+        return
+    
+    async with engine.begin() as conn:
+        if not await _is_partitioned(conn):
+            return
+        await create_audit_log_partitions(conn)
+        await drop_expired_audit_log_partitions(conn)
+
+
+async def audit_partition_loop():
+    """Periodically run audit log partition maintenance"""
+    while True:
+        try:
+            await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL)
+            await maintain_audit_log_partitions()
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error("Failed to maintain audit log partitions", error=str(e))
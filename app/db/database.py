@@ -4,18 +4,76 @@ Database configuration and session management
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import logging
+import orjson
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+
+def _json_serializer(value) -> str:
+    return orjson.dumps(value).decode()
+
+
+def _engine_options() -> dict:
+    """Build engine keyword arguments for the configured database backend"""
+    options = {
+        "echo": settings.database_echo,
+        "future": True,
+        "query_cache_size": settings.db_query_cache_size,
+        # JSON/JSONB columns encode and decode with orjson
+        "json_serializer": _json_serializer,
+        "json_deserializer": orjson.loads
+    }
+    
+    # SQLite connections are file handles, not network sockets; leave the
+    # dialect's default pool in place and wait out writer locks instead of
+    # failing fast with "database is locked"
+    if settings.database_url.startswith("sqlite"):
+        options["connect_args"] = {"timeout": settings.db_sqlite_busy_timeout}
+        return options
+    
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=True,
+        # Reuse the most recently returned connection so idle extras age out
+        # via pool_recycle instead of being kept warm round-robin
+        pool_use_lifo=True
+    )
+    
+    if settings.db_pgbouncer and "+asyncpg" in settings.database_url:
+        # PgBouncer in transaction mode cannot hold prepared statements
+        options["connect_args"] = {
+            "server_settings": {"jit": "off"},
+            "statement_cache_size": 0
+        }
+    
+    return options
+
+
 # Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    future=True
-)
+engine = create_async_engine(settings.database_url, **_engine_options())
+
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """WAL journaling with NORMAL sync: readers never block the writer and
+        commits append to the log instead of fsyncing the database file"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.close()
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -42,6 +100,13 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+def dialect_insert(db: AsyncSession):
+    """Get the backend-specific INSERT construct (supports ON CONFLICT)"""
+    if db.bind.dialect.name == "postgresql":
+        return pg_insert
+    return sqlite_insert
+
+
 async def init_db():
     """Initialize database"""
     try:
@@ -52,6 +117,26 @@ async def init_db():
             # Create all tables
             await conn.run_sync(Base.metadata.create_all)
             
+            # Add columns introduced after the tables were first created
+            from app.db.schema_upgrades import add_missing_columns, convert_bigint_columns
+            await add_missing_columns(conn)
+            
+            # Upgrade traffic counters created as varchar before they were BigInteger
+            await convert_bigint_columns(conn)
+            
+            # Upgrade json columns created before they were declared JSONB
+            from app.db.types import convert_jsonb_columns, create_jsonb_gin_indexes
+            await convert_jsonb_columns(conn)
+            await create_jsonb_gin_indexes(conn)
+            
+            # Create roll-up views (no-op on backends without materialized views)
+            from app.db.stats_views import create_stats_views
+            await create_stats_views(conn)
+            
+            # Monthly audit log partitions (no-op without declarative partitioning)
+            from app.db.audit_partitions import create_audit_log_partitions
+            await create_audit_log_partitions(conn)
+            
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error("Failed to initialize database", error=str(e))
@@ -0,0 +1,36 @@
+"""
+Redis client management
+"""
+
+from typing import Optional
+import redis.asyncio as redis
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """Get the shared Redis client, or None if Redis is not configured"""
+    global _redis_client
+    
+    if not settings.redis_url:
+        return None
+    
+    if _redis_client is None:
+        _redis_client = redis.from_url(settings.redis_url)
+    
+    return _redis_client
+
+
+async def close_redis():
+    """Close the shared Redis client"""
+    global _redis_client
+    
+    if _redis_client is not None:
+        await _redis_client.close()
+        _redis_client = None
+        logger.info("Redis connection closed")
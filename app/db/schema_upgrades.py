@@ -0,0 +1,63 @@
+"""
+Column upgrades for databases created before a column existed or changed type
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+import structlog
+
+logger = structlog.get_logger()
+
+# (table, column, DDL type) added to existing tables at startup; create_all
+# only covers tables that do not exist yet
+ADDED_COLUMNS = [
+    ("jobs", "commands", "JSON"),
+]
+
+# (table, column) declared BigInteger that were created as varchar counters
+BIGINT_COLUMNS = [
+    ("jobs", "packets_sent"),
+    ("jobs", "bytes_sent"),
+    ("jobs", "packets_received"),
+]
+
+_COLUMN_DATA_TYPE = text(
+    "SELECT data_type FROM information_schema.columns "
+    "WHERE table_name = :table AND column_name = :column AND table_schema = current_schema()"
+)
+
+
+def _existing_columns(sync_conn, table: str) -> set:
+    return {column["name"] for column in inspect(sync_conn).get_columns(table)}
+
+
+async def add_missing_columns(conn: AsyncConnection):
+    """Add any ADDED_COLUMNS entries missing from their tables (nullable)"""
+    for table, column, ddl_type in ADDED_COLUMNS:
+        existing = await conn.run_sync(_existing_columns, table)
+        if column in existing:
+            continue
+        
+        await conn.execute(text(f'ALTER TABLE {table} ADD COLUMN "{column}" {ddl_type}'))
+        logger.info("Added column", table=table, column=column)
+
+
+async def convert_bigint_columns(conn: AsyncConnection):
+    """Convert legacy varchar counters in BIGINT_COLUMNS to bigint (PostgreSQL only)
+    
+    SQLite cannot alter column types; its SUM() already coerces numeric text.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    
+    for table, column in BIGINT_COLUMNS:
+        data_type = (await conn.execute(
+            _COLUMN_DATA_TYPE, {"table": table, "column": column}
+        )).scalar_one_or_none()
+        
+        if data_type in ("character varying", "text"):
+            await conn.execute(text(
+                f'ALTER TABLE {table} ALTER COLUMN "{column}" TYPE bigint '
+                f'USING NULLIF("{column}", \'\')::bigint'
+            ))
+            logger.info("Converted column to bigint", table=table, column=column)
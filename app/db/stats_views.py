@@ -0,0 +1,75 @@
+"""
+Materialized views for admin dashboard roll-ups (PostgreSQL only)
+"""
+
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+SYSTEM_STATS_MV = "admin_system_stats_mv"
+
+_CREATE_SYSTEM_STATS_MV = text(f"""
+CREATE MATERIALIZED VIEW IF NOT EXISTS {SYSTEM_STATS_MV} AS
+SELECT
+    1 AS id,
+    (SELECT count(*) FROM users) AS total_users,
+    (SELECT count(*) FROM users WHERE last_login >= now() - interval '30 days') AS active_users_30d,
+    (SELECT count(*) FROM jobs) AS total_jobs,
+    (SELECT count(*) FROM jobs WHERE created_at >= date_trunc('day', now())) AS jobs_today,
+    (SELECT count(*) FROM api_keys) AS total_api_keys
+""")
+
+# REFRESH ... CONCURRENTLY requires a unique index on the view
+_CREATE_SYSTEM_STATS_MV_INDEX = text(
+    f"CREATE UNIQUE INDEX IF NOT EXISTS {SYSTEM_STATS_MV}_id_idx ON {SYSTEM_STATS_MV} (id)"
+)
+
+_REFRESH_SYSTEM_STATS_MV = text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {SYSTEM_STATS_MV}")
+
+SELECT_SYSTEM_STATS_MV = text(
+    f"SELECT total_users, active_users_30d, total_jobs, jobs_today, total_api_keys FROM {SYSTEM_STATS_MV}"
+)
+
+
+def stats_views_supported(dialect_name: str) -> bool:
+    """Check if the database dialect supports materialized views"""
+    return dialect_name == "postgresql"
+
+
+async def create_stats_views(conn: AsyncConnection):
+    """Create the admin stats materialized views if the backend supports them"""
+    if not stats_views_supported(conn.dialect.name):
+        return
+    
+    await conn.execute(_CREATE_SYSTEM_STATS_MV)
+    await conn.execute(_CREATE_SYSTEM_STATS_MV_INDEX)
+
+
+async def refresh_stats_views():
+    """Refresh the admin stats materialized views"""
+    from app.db.database import engine
+    
+    if not stats_views_supported(engine.dialect.name):
+        return
+    
+    async with engine.connect() as conn:
+        # CONCURRENTLY cannot run inside a transaction block
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(_REFRESH_SYSTEM_STATS_MV)
+
+
+async def stats_refresh_loop():
+    """Periodically refresh the admin stats materialized views"""
+    while True:
+        try:
+            await asyncio.sleep(settings.system_stats_refresh_interval)
+            await refresh_stats_views()
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error("Failed to refresh stats views", error=str(e))
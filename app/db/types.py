@@ -0,0 +1,72 @@
+"""
+Custom column types
+"""
+
+from sqlalchemy import JSON, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.types import TypeDecorator
+import structlog
+
+logger = structlog.get_logger()
+
+# Columns declared as BinaryJSON that may still be plain json on databases
+# created before the type existed
+JSONB_COLUMNS = [
+    ("target_groups", "targets"),
+    ("jobs", "tags"),
+]
+
+# GIN indexes serving @> containment filters on JSONB columns
+JSONB_GIN_INDEXES = [
+    ("ix_jobs_tags_gin", "jobs", "tags"),
+]
+
+_COLUMN_DATA_TYPE = text(
+    "SELECT data_type FROM information_schema.columns "
+    "WHERE table_name = :table AND column_name = :column AND table_schema = current_schema()"
+)
+
+
+class BinaryJSON(TypeDecorator):
+    """JSON stored as JSONB on PostgreSQL and as JSON elsewhere
+    
+    Encoding and decoding go through the engine's json_serializer and
+    json_deserializer (orjson). Like plain JSON, values are not
+    change-tracked in place: reassign the attribute to persist edits.
+    """
+    impl = JSON
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(JSON())
+
+
+async def convert_jsonb_columns(conn: AsyncConnection):
+    """Convert legacy json columns in JSONB_COLUMNS to jsonb (PostgreSQL only)"""
+    if conn.dialect.name != "postgresql":
+        return
+    
+    for table, column in JSONB_COLUMNS:
+        data_type = (await conn.execute(
+            _COLUMN_DATA_TYPE, {"table": table, "column": column}
+        )).scalar_one_or_none()
+        
+        if data_type == "json":
+            await conn.execute(text(
+                f'ALTER TABLE {table} ALTER COLUMN "{column}" TYPE jsonb USING "{column}"::jsonb'
+            ))
+            logger.info("Converted column to jsonb", table=table, column=column)
+
+
+async def create_jsonb_gin_indexes(conn: AsyncConnection):
+    """Create the GIN indexes in JSONB_GIN_INDEXES (PostgreSQL only)"""
+    if conn.dialect.name != "postgresql":
+        return
+    
+    for name, table, column in JSONB_GIN_INDEXES:
+        await conn.execute(text(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ("{column}" jsonb_path_ops)'
+        ))
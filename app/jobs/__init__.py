@@ -2,13 +2,13 @@
 Jobs package initialization
 """
 
-from app.jobs.service import JobService, get_job_service, QuotaExceededError, JobValidationError
+from app.jobs.service import JobService, job_service, QuotaExceededError, JobValidationError
 from app.jobs.worker import JobWorker, JobProcess, job_worker
 from app.jobs.manager import JobManager, job_manager
 
 __all__ = [
     "JobService",
-    "get_job_service",
+    "job_service",
     "QuotaExceededError",
     "JobValidationError",
     "JobWorker",
@@ -3,11 +3,13 @@ Job manager that coordinates between service and worker
 """
 
 import asyncio
+import time
 from typing import Dict, Any, Optional, List
 from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
 import structlog
 
-from app.jobs.service import JobService
+from app.jobs.service import job_service
 from app.jobs.worker import job_worker
 from app.api.schemas import JobStatus, JobCreateRequest
 from app.models.job import Job
@@ -49,7 +51,7 @@ class JobManager:
     
     async def submit_job(
         self,
-        job_service: JobService,
+        db: AsyncSession,
         job_spec: JobCreateRequest,
         user_id: Optional[str] = None,
         api_key_id: Optional[str] = None,
@@ -60,6 +62,7 @@ class JobManager:
         
         # Create job record
         job = await job_service.create_job(
+            db=db,
             job_spec=job_spec,
             user_id=user_id,
             api_key_id=api_key_id,
@@ -69,34 +72,52 @@ class JobManager:
         
         # If not dry run, start execution immediately
         if not job_spec.dry_run:
-            await self._start_job_execution(job_service, job)
+            await self._start_job_execution(db, job)
         
         return job
     
     async def stop_job(
         self,
-        job_service: JobService,
+        db: AsyncSession,
         job_id: str,
         user_id: Optional[str] = None,
         api_key_id: Optional[str] = None,
-        force: bool = False
-    ) -> bool:
-        """Stop a running job"""
+        force: bool = False,
+        owner_id: Optional[str] = None
+    ) -> Optional[Job]:
+        """Stop a running job
         
-        # Stop in worker
-        worker_stopped = await job_worker.stop_job(job_id, force)
+        Returns the job if either the database row or the worker process
+        was stopped, or None if neither was (missing, not owned by
+        `owner_id`, or already finished).
+        """
         
         # Update database
-        service_stopped = await job_service.stop_job(
+        job = await job_service.stop_job(
+            db=db,
             job_id=job_id,
             user_id=user_id,
             api_key_id=api_key_id,
-            force=force
+            force=force,
+            owner_id=owner_id
         )
         
-        return worker_stopped or service_stopped
+        # Stop in worker
+        if job is not None:
+            await job_worker.stop_job(job_id, force)
+            return job
+        
+        # The row was not stoppable, but the process may still be alive if
+        # the database and worker drifted apart; stop it if the caller may
+        owner = await job_service.get_job_owner(db, job_id)
+        if owner is None or (owner_id is not None and owner.user_id != owner_id):
+            return None
+        if await job_worker.stop_job(job_id, force):
+            return await job_service.get_job(db, job_id)
+        
+        return None
     
-    async def emergency_stop_all(self, job_service: JobService):
+    async def emergency_stop_all(self, db: AsyncSession):
         """Emergency stop all running jobs"""
         
         self.logger.warning("Emergency stop activated - stopping all jobs")
@@ -105,24 +126,12 @@ class JobManager:
         await job_worker.stop_all_jobs(force=True)
         
         # Update all active jobs in database
-        from app.db.database import AsyncSessionLocal
-        async with AsyncSessionLocal() as db:
-            service = JobService(db)
-            
-            # Get all active jobs
-            result = await service.list_jobs(
-                status_filter=[JobStatus.QUEUED.value, JobStatus.RUNNING.value, JobStatus.STARTING.value]
-            )
-            
-            # Mark them as cancelled
-            for job in result["jobs"]:
-                await service.update_job_status(
-                    job_id=job.id,
-                    status=JobStatus.CANCELLED.value,
-                    error_message="Emergency stop activated"
-                )
+        cancelled_ids = await job_service.cancel_active_jobs(
+            db=db,
+            error_message="Emergency stop activated"
+        )
         
-        self.logger.info("Emergency stop completed")
+        self.logger.info("Emergency stop completed", cancelled_count=len(cancelled_ids))
     
     async def get_system_status(self) -> Dict[str, Any]:
         """Get overall system status"""
@@ -136,48 +145,35 @@ class JobManager:
             "last_check": datetime.utcnow().isoformat()
         }
     
-    async def _start_job_execution(self, job_service: JobService, job: Job):
+    async def _start_job_execution(self, db: AsyncSession, job: Job):
         """Start actual job execution"""
         
         try:
-            # Generate commands for all targets
-            job_spec = JobCreateRequest(
-                name=job.name,
-                targets=job.targets,
-                target_group=job.target_group,
-                traffic_type=job.traffic_type,
-                dst_port=job.dst_port,
-                src_port=job.src_port,
-                pps=job.pps,
-                packet_size=job.packet_size,
-                ttl=job.ttl,
-                iface=job.iface,
-                spoof_source=job.spoof_source,
-                source_ip=job.source_ip,
-                payload=job.payload,
-                hping_options=job.hping_options,
-                duration=job.duration,
-                dry_run=job.dry_run,
-                priority=job.priority,
-                tags=job.tags
-            )
-            
-            command_result = generate_job_commands(job_spec)
-            if not command_result["success"]:
-                await job_service.update_job_status(
-                    job_id=job.id,
-                    status=JobStatus.FAILED.value,
-                    error_message=f"Command generation failed: {command_result.get('error')}"
-                )
-                return
+            # Commands are planned once by create_job; only rows created
+            # before the commands column existed are planned again here
+            commands = job.commands
+            if commands is None:
+                job_spec = JobCreateRequest.model_validate(job, from_attributes=True)
+                
+                command_result = generate_job_commands(job_spec)
+                if not command_result["success"]:
+                    await job_service.update_job_status(
+                        db=db,
+                        job_id=job.id,
+                        status=JobStatus.FAILED.value,
+                        error_message=f"Command generation failed: {command_result.get('error')}"
+                    )
+                    return
+                commands = command_result["commands"]
             
             # For now, start job for first target (could be extended to handle multiple targets)
             first_target = job.targets[0] if job.targets else None
-            if first_target and first_target in command_result["commands"]:
-                command = command_result["commands"][first_target]
+            if first_target and first_target in commands:
+                command = commands[first_target]
                 
                 # Update status to starting
                 await job_service.update_job_status(
+                    db=db,
                     job_id=job.id,
                     status=JobStatus.STARTING.value
                 )
@@ -192,17 +188,20 @@ class JobManager:
                 
                 if success:
                     await job_service.update_job_status(
+                        db=db,
                         job_id=job.id,
                         status=JobStatus.RUNNING.value
                     )
                 else:
                     await job_service.update_job_status(
+                        db=db,
                         job_id=job.id,
                         status=JobStatus.FAILED.value,
                         error_message="Failed to start hping3 process"
                     )
             else:
                 await job_service.update_job_status(
+                    db=db,
                     job_id=job.id,
                     status=JobStatus.FAILED.value,
                     error_message="No valid targets found"
@@ -214,52 +213,61 @@ class JobManager:
                             error=str(e))
             
             await job_service.update_job_status(
+                db=db,
                 job_id=job.id,
                 status=JobStatus.FAILED.value,
                 error_message=f"Execution failed: {str(e)}"
             )
     
     async def _monitoring_loop(self):
-        """Main monitoring loop"""
+        """Main monitoring loop
+        
+        Sleeps on job_worker.wake: while jobs run it also wakes every
+        process_check_interval to refresh their stats; when idle it only
+        wakes for a new job or the periodic zombie scan.
+        """
         
         from app.db.database import AsyncSessionLocal
         from app.api.websocket import broadcast_job_update
         
+        last_cleanup = 0.0
+        
         while not self._shutdown:
             try:
+                if job_worker.get_active_job_count():
+                    timeout = settings.process_check_interval
+                else:
+                    timeout = settings.zombie_cleanup_interval
+                try:
+                    await asyncio.wait_for(job_worker.wake.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                job_worker.wake.clear()
+                
                 # Get updates from worker
                 updates = await job_worker.monitor_jobs()
                 
                 if updates:
-                    # Update database with job status
+                    # One bulk UPDATE and one SELECT per pass, whatever the
+                    # number of running jobs
                     async with AsyncSessionLocal() as db:
-                        service = JobService(db)
-                        
-                        for update in updates:
-                            # Update job in database
-                            job = await service.update_job_status(
-                                job_id=update["job_id"],
-                                status=update["status"],
-                                packets_sent=update.get("packets_sent"),
-                                bytes_sent=update.get("bytes_sent"),
-                                stdout_log=update.get("stdout_log"),
-                                stderr_log=update.get("stderr_log"),
-                                error_message=update.get("error_message")
-                            )
-                            
-                            # Broadcast update via websocket
-                            if job:
-                                try:
-                                    await broadcast_job_update(job)
-                                except Exception as e:
-                                    logger.error("Failed to broadcast job update", 
-                                               job_id=job.id, error=str(e))
+                        jobs = await job_service.apply_worker_updates(db, updates)
+                    
+                    # Broadcast updates via websocket once they are committed
+                    results = await asyncio.gather(
+                        *(broadcast_job_update(job) for job in jobs),
+                        return_exceptions=True
+                    )
+                    for job, result in zip(jobs, results):
+                        if isinstance(result, Exception):
+                            logger.error("Failed to broadcast job update", 
+                                       job_id=job.id, error=str(result))
                 
                 # Clean up zombie processes periodically
-                await job_worker.cleanup_zombie_processes()
-                
-                # Wait before next check
-                await asyncio.sleep(settings.process_check_interval)
+                now = time.monotonic()
+                if now - last_cleanup >= settings.zombie_cleanup_interval:
+                    await job_worker.cleanup_zombie_processes()
+                    last_cleanup = now
                 
             except asyncio.CancelledError:
                 break
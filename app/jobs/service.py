@@ -4,15 +4,16 @@ Job management service
 
 from typing import List, Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, and_, func, desc
-from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, and_, func, desc, case, cast, exists, bindparam
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime, timedelta, timezone
 import uuid
 import asyncio
 import structlog
 
 from app.models.job import Job
 from app.models.user import User, ApiKey
-from app.models.audit_log import AuditLog
+from app.db.audit_batcher import audit_batcher
 from app.api.schemas import JobCreateRequest, JobStatus, JobResponse
 from app.utils.validation import network_validator
 from app.utils.hping import generate_job_commands, validate_job_spec
@@ -20,6 +21,34 @@ from app.config import settings
 
 logger = structlog.get_logger()
 
+# Maximum rows removed per transaction by cleanup_old_jobs
+CLEANUP_BATCH_SIZE = 10000
+
+# Hot-path statements built once at import; calls only bind parameters and
+# hit the compiled cache
+_SELECT_JOB_BY_ID = select(Job).where(Job.id == bindparam("job_id"))
+_COUNT_ACTIVE_JOBS = select(func.count(Job.id)).where(
+    Job.user_id == bindparam("user_id"),
+    Job.status.in_([JobStatus.QUEUED.value, JobStatus.STARTING.value, JobStatus.RUNNING.value])
+)
+
+# Everything _check_quotas needs in one round trip: the user's quotas, the
+# API key's quotas and the user's active job count
+_SELECT_QUOTA_INPUTS = select(
+    select(User.quotas).where(User.id == bindparam("user_id")).scalar_subquery(),
+    select(ApiKey.quotas).where(ApiKey.id == bindparam("api_key_id")).scalar_subquery(),
+    _COUNT_ACTIVE_JOBS.scalar_subquery()
+)
+
+_COUNT_QUEUED_OR_RUNNING_JOBS = select(func.count(Job.id)).where(
+    Job.user_id == bindparam("user_id"),
+    Job.status.in_([JobStatus.QUEUED.value, JobStatus.RUNNING.value])
+)
+_COUNT_JOBS_CREATED_SINCE = select(func.count(Job.id)).where(
+    Job.user_id == bindparam("user_id"),
+    Job.created_at >= bindparam("since")
+)
+
 
 class QuotaExceededError(Exception):
     """Raised when user/API key quotas are exceeded"""
@@ -34,12 +63,12 @@ class JobValidationError(Exception):
 class JobService:
     """Service for managing hping3 jobs"""
     
-    def __init__(self, db: AsyncSession):
-        self.db = db
+    def __init__(self):
         self.logger = structlog.get_logger()
     
     async def create_job(
-        self, 
+        self,
+        db: AsyncSession,
         job_spec: JobCreateRequest, 
         user_id: Optional[str] = None,
         api_key_id: Optional[str] = None,
@@ -59,7 +88,7 @@ class JobService:
             raise JobValidationError(f"Target validation failed: {target_errors}")
         
         # Check quotas
-        await self._check_quotas(user_id, api_key_id, job_spec)
+        await self._check_quotas(db, user_id, api_key_id, job_spec)
         
         # Generate commands
         command_result = generate_job_commands(job_spec)
@@ -94,16 +123,18 @@ class JobService:
             queued_at=datetime.utcnow(),
             client_ip=client_ip,
             user_agent=user_agent,
-            command=str(command_result["command_strings"])
+            command=str(command_result["command_strings"]),
+            commands=command_result["commands"]
         )
         
         # Save to database
-        self.db.add(job)
-        await self.db.commit()
-        await self.db.refresh(job)
+        # Every column is populated client-side and expire_on_commit is off,
+        # so the committed instance needs no refresh
+        db.add(job)
+        await db.commit()
         
         # Log audit event
-        await self._log_audit_event(
+        self._queue_audit_event(
             action="create",
             resource_type="job",
             resource_id=job.id,
@@ -128,24 +159,20 @@ class JobService:
         
         return job
     
-    async def get_job(self, job_id: str) -> Optional[Job]:
+    async def get_job(self, db: AsyncSession, job_id: str) -> Optional[Job]:
         """Get job by ID"""
-        result = await self.db.execute(select(Job).where(Job.id == job_id))
+        result = await db.execute(_SELECT_JOB_BY_ID, {"job_id": job_id})
         return result.scalar_one_or_none()
     
-    async def list_jobs(
+    def _job_conditions(
         self,
+        db: AsyncSession,
         user_id: Optional[str] = None,
         status_filter: Optional[List[str]] = None,
-        limit: int = 50,
-        offset: int = 0,
         tags: Optional[List[str]] = None
-    ) -> Dict[str, Any]:
-        """List jobs with filtering"""
-        
-        query = select(Job)
+    ) -> list:
+        """Build the job filter predicates shared by list_jobs and stream_jobs"""
         
-        # Apply filters
         conditions = []
         if user_id:
             conditions.append(Job.user_id == user_id)
@@ -154,22 +181,48 @@ class JobService:
             conditions.append(Job.status.in_(status_filter))
         
         if tags:
-            # Filter by tags (JSON contains)
-            for tag in tags:
-                conditions.append(Job.tags.contains([tag]))
+            if db.bind.dialect.name == "postgresql":
+                # One jsonb containment check for all tags (GIN-indexed)
+                conditions.append(Job.tags.op("@>")(cast(tags, JSONB)))
+            else:
+                for tag in tags:
+                    elements = func.json_each(Job.tags).table_valued("value")
+                    conditions.append(exists().where(elements.c.value == tag))
+        
+        return conditions
+    
+    async def _count_jobs(self, db: AsyncSession, conditions: list) -> int:
+        """Count matching jobs directly, without wrapping the page query"""
         
+        count_query = select(func.count(Job.id))
         if conditions:
-            query = query.where(and_(*conditions))
+            count_query = count_query.where(and_(*conditions))
+        return (await db.execute(count_query)).scalar()
+    
+    async def list_jobs(
+        self,
+        db: AsyncSession,
+        user_id: Optional[str] = None,
+        status_filter: Optional[List[str]] = None,
+        limit: int = 50,
+        offset: int = 0,
+        tags: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """List jobs with filtering"""
         
-        # Count total
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar()
+        conditions = self._job_conditions(db, user_id, status_filter, tags)
+        total = await self._count_jobs(db, conditions)
         
         # Apply ordering and pagination
-        query = query.order_by(desc(Job.created_at)).limit(limit).offset(offset)
+        query = (
+            select(Job)
+            .where(*conditions)
+            .order_by(desc(Job.created_at))
+            .limit(limit)
+            .offset(offset)
+        )
         
-        result = await self.db.execute(query)
+        result = await db.execute(query)
         jobs = result.scalars().all()
         
         return {
@@ -179,39 +232,87 @@ class JobService:
             "offset": offset
         }
     
+    async def stream_jobs(
+        self,
+        db: AsyncSession,
+        user_id: Optional[str] = None,
+        status_filter: Optional[List[str]] = None,
+        limit: int = 50,
+        offset: int = 0,
+        tags: Optional[List[str]] = None
+    ):
+        """Count matching jobs and open a server-side cursor over the page
+        
+        Returns (total, AsyncScalarResult); rows are fetched as the caller
+        iterates, so the page is never held in memory at once.
+        """
+        
+        conditions = self._job_conditions(db, user_id, status_filter, tags)
+        total = await self._count_jobs(db, conditions)
+        
+        query = (
+            select(Job)
+            .where(*conditions)
+            .order_by(desc(Job.created_at))
+            .limit(limit)
+            .offset(offset)
+        )
+        jobs = await db.stream_scalars(query)
+        
+        return total, jobs
+    
     async def stop_job(
         self,
+        db: AsyncSession,
         job_id: str,
         user_id: Optional[str] = None,
         api_key_id: Optional[str] = None,
         force: bool = False,
-        reason: Optional[str] = None
-    ) -> bool:
-        """Stop a running job"""
-        
-        job = await self.get_job(job_id)
-        if not job:
-            return False
-        
-        # Check if user can stop this job
-        if user_id and job.user_id != user_id:
-            # Allow admins to stop any job (would need role check here)
-            pass
-        
-        # Update job status
-        if job.status in [JobStatus.QUEUED.value, JobStatus.STARTING.value]:
-            job.status = JobStatus.CANCELLED.value
-        elif job.status == JobStatus.RUNNING.value:
-            job.status = JobStatus.STOPPING.value if not force else JobStatus.CANCELLED.value
-        else:
-            return False  # Job not in stoppable state
+        reason: Optional[str] = None,
+        owner_id: Optional[str] = None
+    ) -> Optional[Job]:
+        """Stop a running job
+        
+        The state transition and ownership check run as a single
+        UPDATE ... RETURNING; `owner_id` restricts the update to that
+        user's jobs (None allows any job). A forced stop also cancels jobs
+        already stopping. Returns the updated job, or None if no stoppable
+        job matched.
+        """
+        
+        stoppable = [JobStatus.QUEUED.value, JobStatus.STARTING.value, JobStatus.RUNNING.value]
+        if force:
+            stoppable.append(JobStatus.STOPPING.value)
+        
+        conditions = [
+            Job.id == job_id,
+            Job.status.in_(stoppable)
+        ]
+        if owner_id is not None:
+            conditions.append(Job.user_id == owner_id)
+        
+        # Queued/starting/stopping jobs are cancelled outright; running jobs
+        # move to stopping unless forced
+        new_status = case(
+            (Job.status == JobStatus.RUNNING.value,
+             JobStatus.CANCELLED.value if force else JobStatus.STOPPING.value),
+            else_=JobStatus.CANCELLED.value
+        )
         
-        job.completed_at = datetime.utcnow()
+        result = await db.execute(
+            update(Job)
+            .where(and_(*conditions))
+            .values(status=new_status, completed_at=datetime.utcnow())
+            .returning(Job)
+        )
+        job = result.scalar_one_or_none()
+        if job is None:
+            return None
         
-        await self.db.commit()
+        await db.commit()
         
         # Log audit event
-        await self._log_audit_event(
+        self._queue_audit_event(
             action="stop" if not force else "force_stop",
             resource_type="job",
             resource_id=job_id,
@@ -220,7 +321,7 @@ class JobService:
             details={
                 "reason": reason,
                 "force": force,
-                "previous_status": job.status
+                "status": job.status
             }
         )
         
@@ -229,10 +330,16 @@ class JobService:
                         force=force,
                         reason=reason)
         
-        return True
+        return job
+    
+    async def get_job_owner(self, db: AsyncSession, job_id: str):
+        """Get the (user_id,) row for a job, or None if it does not exist"""
+        result = await db.execute(select(Job.user_id).where(Job.id == job_id))
+        return result.one_or_none()
     
     async def update_job_status(
         self,
+        db: AsyncSession,
         job_id: str,
         status: str,
         pid: Optional[int] = None,
@@ -242,85 +349,129 @@ class JobService:
         packets_sent: Optional[int] = None,
         bytes_sent: Optional[int] = None
     ) -> Optional[Job]:
-        """Update job status and statistics"""
-        
-        job = await self.get_job(job_id)
-        if not job:
-            return None
-        
-        # Update fields
-        job.status = status
-        if pid is not None:
-            job.pid = pid
-        if error_message is not None:
-            job.error_message = error_message
-        if stdout_log is not None:
-            job.stdout_log = stdout_log
-        if stderr_log is not None:
-            job.stderr_log = stderr_log
-        if packets_sent is not None:
-            job.packets_sent = str(packets_sent)
-        if bytes_sent is not None:
-            job.bytes_sent = str(bytes_sent)
+        """Update job status and statistics in one UPDATE ... RETURNING"""
+        
+        changes: Dict[str, Any] = {"status": status}
+        for field, value in (
+            ("pid", pid),
+            ("error_message", error_message),
+            ("stdout_log", stdout_log),
+            ("stderr_log", stderr_log),
+            ("packets_sent", packets_sent),
+            ("bytes_sent", bytes_sent)
+        ):
+            if value is not None:
+                changes[field] = value
         
         # Update timestamps
-        if status == JobStatus.RUNNING.value and not job.started_at:
-            job.started_at = datetime.utcnow()
+        if status == JobStatus.RUNNING.value:
+            changes["started_at"] = func.coalesce(Job.started_at, datetime.utcnow())
         elif status in [JobStatus.COMPLETED.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value]:
-            job.completed_at = datetime.utcnow()
+            changes["completed_at"] = datetime.utcnow()
+        
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(**changes)
+            .returning(Job)
+        )
+        job = result.scalar_one_or_none()
         
-        await self.db.commit()
-        await self.db.refresh(job)  # Refresh to get updated values
+        await db.commit()
         return job
     
-    async def cleanup_old_jobs(self, days: int = 30) -> int:
-        """Clean up old completed jobs"""
-        
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+    async def apply_worker_updates(self, db: AsyncSession, updates: List[Dict[str, Any]]) -> List[Job]:
+        """Persist a monitoring pass's worker updates and return the jobs
+        
+        All rows go out as one bulk UPDATE by primary key (executemany),
+        followed by a single SELECT of the updated jobs for broadcasting.
+        Commits the caller's transaction.
+        """
+        
+        now = datetime.utcnow()
+        finished = {JobStatus.COMPLETED.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value}
+        
+        rows = []
+        for item in updates:
+            row = {"id": item["job_id"], "status": item["status"]}
+            for field in ("packets_sent", "bytes_sent", "exit_code", "stdout_log", "stderr_log", "error_message"):
+                if item.get(field) is not None:
+                    row[field] = item[field]
+            if item["status"] in finished:
+                row["completed_at"] = now
+            rows.append(row)
+        
+        await db.execute(update(Job), rows)
+        await db.commit()
+        
+        result = await db.execute(select(Job).where(Job.id.in_([row["id"] for row in rows])))
+        return list(result.scalars().all())
+    
+    async def cancel_active_jobs(self, db: AsyncSession, error_message: Optional[str] = None) -> List[str]:
+        """Cancel all queued/starting/running jobs in one statement, returning their IDs"""
         
-        # Delete old completed jobs
-        result = await self.db.execute(
+        result = await db.execute(
             update(Job)
             .where(
-                and_(
-                    Job.completed_at < cutoff_date,
-                    Job.status.in_([JobStatus.COMPLETED.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value])
-                )
+                Job.status.in_([JobStatus.QUEUED.value, JobStatus.STARTING.value, JobStatus.RUNNING.value])
             )
             .values(
-                stdout_log=None,  # Clear logs to save space
-                stderr_log=None
+                status=JobStatus.CANCELLED.value,
+                error_message=error_message,
+                completed_at=datetime.utcnow()
             )
+            .returning(Job.id)
         )
+        job_ids = list(result.scalars().all())
         
-        await self.db.commit()
-        return result.rowcount
+        await db.commit()
+        return job_ids
     
-    async def get_user_stats(self, user_id: str) -> Dict[str, Any]:
-        """Get statistics for a user"""
+    async def cleanup_old_jobs(self, db: AsyncSession, days: int = 30) -> int:
+        """Delete old completed jobs in bounded batches"""
         
-        # Current active jobs
-        active_result = await self.db.execute(
-            select(func.count())
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        
+        expired_ids = (
+            select(Job.id)
             .where(
                 and_(
-                    Job.user_id == user_id,
-                    Job.status.in_([JobStatus.QUEUED.value, JobStatus.RUNNING.value])
+                    Job.completed_at < cutoff_date,
+                    Job.status.in_([JobStatus.COMPLETED.value, JobStatus.FAILED.value, JobStatus.CANCELLED.value])
                 )
             )
+            .limit(CLEANUP_BATCH_SIZE)
         )
+        
+        # Commit per batch to keep lock time and transaction size bounded
+        deleted = 0
+        while True:
+            result = await db.execute(
+                delete(Job)
+                .where(Job.id.in_(expired_ids.scalar_subquery()))
+                .returning(Job.id)
+                .execution_options(synchronize_session=False)
+            )
+            batch_count = len(result.scalars().all())
+            await db.commit()
+            
+            deleted += batch_count
+            if batch_count < CLEANUP_BATCH_SIZE:
+                break
+        
+        return deleted
+    
+    async def get_user_stats(self, db: AsyncSession, user_id: str) -> Dict[str, Any]:
+        """Get statistics for a user"""
+        
+        # Current active jobs
+        active_result = await db.execute(_COUNT_QUEUED_OR_RUNNING_JOBS, {"user_id": user_id})
         active_jobs = active_result.scalar()
         
         # Total jobs today
         today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_result = await self.db.execute(
-            select(func.count())
-            .where(
-                and_(
-                    Job.user_id == user_id,
-                    Job.created_at >= today_start
-                )
-            )
+        today_result = await db.execute(
+            _COUNT_JOBS_CREATED_SINCE, {"user_id": user_id, "since": today_start}
         )
         jobs_today = today_result.scalar()
         
@@ -331,26 +482,20 @@ class JobService:
     
     async def _check_quotas(
         self,
+        db: AsyncSession,
         user_id: Optional[str],
         api_key_id: Optional[str],
         job_spec: JobCreateRequest
     ):
         """Check if job would exceed quotas"""
         
-        quotas = {}
-        
-        # Get quotas from user or API key
-        if user_id:
-            user_result = await self.db.execute(select(User).where(User.id == user_id))
-            user = user_result.scalar_one_or_none()
-            if user:
-                quotas = user.quotas or {}
+        result = await db.execute(
+            _SELECT_QUOTA_INPUTS, {"user_id": user_id, "api_key_id": api_key_id}
+        )
+        user_quotas, key_quotas, active_jobs = result.one()
         
-        if api_key_id:
-            key_result = await self.db.execute(select(ApiKey).where(ApiKey.id == api_key_id))
-            api_key = key_result.scalar_one_or_none()
-            if api_key:
-                quotas = api_key.quotas or {}
+        # API key quotas take precedence over the user's
+        quotas = (key_quotas if key_quotas is not None else user_quotas) or {}
         
         # Check PPS quota
         max_pps = quotas.get("max_pps", settings.default_max_pps)
@@ -359,7 +504,6 @@ class JobService:
         
         # Check concurrent jobs quota
         max_concurrent = quotas.get("max_concurrent_jobs", settings.default_max_concurrent_jobs)
-        active_jobs = await self._get_active_job_count(user_id)
         if active_jobs >= max_concurrent:
             raise QuotaExceededError(f"Active jobs {active_jobs} would exceed quota of {max_concurrent}")
         
@@ -368,23 +512,7 @@ class JobService:
         if job_spec.duration > max_duration:
             raise QuotaExceededError(f"Duration {job_spec.duration}s exceeds quota of {max_duration}s")
     
-    async def _get_active_job_count(self, user_id: Optional[str]) -> int:
-        """Get count of active jobs for user"""
-        if not user_id:
-            return 0
-            
-        result = await self.db.execute(
-            select(func.count())
-            .where(
-                and_(
-                    Job.user_id == user_id,
-                    Job.status.in_([JobStatus.QUEUED.value, JobStatus.STARTING.value, JobStatus.RUNNING.value])
-                )
-            )
-        )
-        return result.scalar()
-    
-    async def _log_audit_event(
+    def _queue_audit_event(
         self,
         action: str,
         resource_type: str,
@@ -395,25 +523,26 @@ class JobService:
         client_ip: Optional[str] = None,
         user_agent: Optional[str] = None
     ):
-        """Log an audit event"""
-        
-        audit_log = AuditLog(
-            id=str(uuid.uuid4()),
-            user_id=user_id,
-            api_key_id=api_key_id,
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            details=details or {},
-            ip_address=client_ip,
-            user_agent=user_agent,
-            timestamp=datetime.utcnow()
-        )
-        
-        self.db.add(audit_log)
-        await self.db.commit()
+        """Queue an audit event; the audit batcher writes it in a later batch
+        
+        Nothing is awaited or committed on the caller's transaction, so a
+        job mutation costs exactly one commit.
+        """
+        
+        audit_batcher.put({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "api_key_id": api_key_id,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "details": details or {},
+            "ip_address": client_ip,
+            "user_agent": user_agent,
+            "request_id": None,
+            "timestamp": datetime.now(timezone.utc)
+        })
 
 
-async def get_job_service(db: AsyncSession) -> JobService:
-    """Dependency to get job service"""
-    return JobService(db)
\ No newline at end of file
+# Global job service instance (stateless; sessions are passed per call)
+job_service = JobService()
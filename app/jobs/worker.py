@@ -8,7 +8,7 @@ import signal
 import os
 import time
 import re
-from typing import Dict, Optional, List, Tuple, Any
+from typing import Dict, Optional, List, Set, Tuple, Any
 from dataclasses import dataclass
 from datetime import datetime
 import structlog
@@ -213,6 +213,10 @@ class JobWorker:
         self.active_jobs: Dict[str, JobProcess] = {}
         self.logger = structlog.get_logger()
         self._shutdown = False
+        # Set when a job starts or a process exits; the monitoring loop
+        # sleeps on it instead of polling an idle worker
+        self.wake = asyncio.Event()
+        self._exit_watchers: Set[asyncio.Task] = set()
     
     async def start_job(self, job_id: str, command: List[str], target: str, dry_run: bool = False) -> bool:
         """Start a new job process"""
@@ -232,12 +236,23 @@ class JobWorker:
         
         if success:
             self.active_jobs[job_id] = job_process
+            watcher = asyncio.create_task(self._watch_exit(job_process))
+            self._exit_watchers.add(watcher)
+            watcher.add_done_callback(self._exit_watchers.discard)
+            self.wake.set()
             self.logger.info("Job started successfully", 
                            job_id=job_id, 
                            pid=job_process.pid)
         
         return success
     
+    async def _watch_exit(self, job_process: JobProcess):
+        """Wake the monitoring loop as soon as a process exits"""
+        try:
+            await job_process.process.wait()
+        finally:
+            self.wake.set()
+    
     async def stop_job(self, job_id: str, force: bool = False) -> bool:
         """Stop a job process"""
         
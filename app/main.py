@@ -5,15 +5,24 @@ Main FastAPI application entry point
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import structlog
 import time
 
 from app.config import settings
-from app.db.database import init_db, close_db
+from app.db.database import init_db, close_db, AsyncSessionLocal
+from app.db.redis import close_redis
+from app.db.stats_views import stats_refresh_loop
+from app.db.audit_partitions import audit_partition_loop
+from app.db.audit_batcher import audit_batcher
+from app.db.allowlist_events import allowlist_listener_loop
 from app.api.routes import api_router
+from app.api.websocket import clock_tick_loop
+from app.auth.dependencies import api_key_last_used_loop, flush_api_key_last_used
+from app.utils.validation import network_validator
 from app.utils.logging import setup_logging
 
 
@@ -28,10 +37,26 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Hping3 Traffic Orchestrator", version=settings.app_version)
     await init_db()
+    async with AsyncSessionLocal() as db:
+        await network_validator.reload(db)
+    stats_refresh_task = asyncio.create_task(stats_refresh_loop())
+    audit_partition_task = asyncio.create_task(audit_partition_loop())
+    allowlist_listener_task = asyncio.create_task(allowlist_listener_loop())
+    clock_tick_task = asyncio.create_task(clock_tick_loop())
+    last_used_task = asyncio.create_task(api_key_last_used_loop())
+    audit_batcher.start()
     yield
     # Shutdown
     logger.info("Shutting down Hping3 Traffic Orchestrator")
+    stats_refresh_task.cancel()
+    audit_partition_task.cancel()
+    allowlist_listener_task.cancel()
+    clock_tick_task.cancel()
+    last_used_task.cancel()
+    await flush_api_key_last_used()
+    await audit_batcher.stop()
     await close_db()
+    await close_redis()
 
 
 # Create FastAPI application
@@ -42,6 +67,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url=f"{settings.api_prefix}/openapi.json",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -146,5 +172,7 @@ if __name__ == "__main__":
         port=settings.port,
         reload=settings.debug,
         workers=1 if settings.debug else settings.workers,
+        loop=settings.event_loop,
+        ws_per_message_deflate=settings.ws_per_message_deflate,
         log_config=None  # We handle logging ourselves
     )
\ No newline at end of file
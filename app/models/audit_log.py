@@ -2,7 +2,7 @@
 Audit log model
 """
 
-from sqlalchemy import Column, String, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -13,6 +13,9 @@ from app.db.database import Base
 class AuditLog(Base):
     """Audit log model for tracking all system actions"""
     __tablename__ = "audit_logs"
+    # Range-partitioned by month on PostgreSQL (see app/db/audit_partitions.py);
+    # the partition key must be part of the primary key
+    __table_args__ = {"postgresql_partition_by": 'RANGE ("timestamp")'}
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     
@@ -34,7 +37,7 @@ class AuditLog(Base):
     request_id = Column(String(50))  # Request tracking ID
     
     # Timestamp
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    timestamp = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="audit_logs")
@@ -56,4 +59,27 @@ class AuditLog(Base):
             "details": self.details or {},
             "ip_address": self.ip_address,
             "user_agent": self.user_agent
-        }
\ No newline at end of file
+        }
+
+
+# Backs keyset pagination in list_audit_logs (ORDER BY timestamp DESC, id DESC)
+Index("ix_audit_logs_timestamp_id", AuditLog.timestamp.desc(), AuditLog.id.desc())
+
+# Matches the filtered list_audit_logs query so the newest rows for a
+# user/action/resource combination come straight off the index
+Index(
+    "ix_audit_logs_filter_ts",
+    AuditLog.user_id,
+    AuditLog.action,
+    AuditLog.resource_type,
+    AuditLog.timestamp.desc(),
+    AuditLog.id.desc()
+)
+
+# Audit rows are append-only, so a BRIN index serves time-range scans at a
+# fraction of a btree's size (PostgreSQL only)
+Index(
+    "ix_audit_logs_timestamp_brin",
+    AuditLog.timestamp,
+    postgresql_using="brin"
+).ddl_if(dialect="postgresql")
@@ -2,13 +2,14 @@
 Job model
 """
 
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, Text, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from enum import Enum
 import uuid
 
 from app.db.database import Base
+from app.db.types import BinaryJSON
 
 
 class JobStatus(str, Enum):
@@ -50,12 +51,13 @@ class Job(Base):
     duration = Column(Integer, default=60)  # seconds, 0 = infinite
     dry_run = Column(Boolean, default=False)
     priority = Column(String(10), default="normal")  # low, normal, high
-    tags = Column(JSON, default=[])  # List of tags
+    tags = Column(BinaryJSON, default=[])  # List of tags (GIN-indexed on PostgreSQL)
     
     # Execution state
     status = Column(String(20), default="queued", nullable=False, index=True)
     pid = Column(Integer)  # Process ID when running
     command = Column(Text)  # Generated hping3 command
+    commands = Column(JSON)  # Target -> hping3 argv, planned at creation
     exit_code = Column(Integer)
     error_message = Column(Text)
     
@@ -63,12 +65,12 @@ class Job(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     queued_at = Column(DateTime(timezone=True))
     started_at = Column(DateTime(timezone=True))
-    completed_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True), index=True)
     
     # Statistics
-    packets_sent = Column(String, default="0")  # Use string for big numbers
-    bytes_sent = Column(String, default="0")
-    packets_received = Column(String, default="0")
+    packets_sent = Column(BigInteger, default=0)
+    bytes_sent = Column(BigInteger, default=0)
+    packets_received = Column(BigInteger, default=0)
     
     # Output and logs
     stdout_log = Column(Text)  # Captured stdout
@@ -116,4 +118,18 @@ class Job(Base):
             "packets_sent": int(self.packets_sent) if self.packets_sent else 0,
             "bytes_sent": int(self.bytes_sent) if self.bytes_sent else 0,
             "error_message": self.error_message
-        }
\ No newline at end of file
+        }
+
+
+# Per-user job listing, newest first (list_jobs for non-admins)
+Index("ix_jobs_user_created", Job.user_id, Job.created_at.desc())
+
+# Active jobs are a small, hot subset: quota checks, the running count in
+# the metrics summary and the active-jobs gauge all filter on it
+_ACTIVE_JOB_STATUSES = Job.status.in_(["queued", "starting", "running"])
+Index(
+    "ix_jobs_active_status",
+    Job.status,
+    postgresql_where=_ACTIVE_JOB_STATUSES,
+    sqlite_where=_ACTIVE_JOB_STATUSES
+)
@@ -2,11 +2,12 @@
 Target group model
 """
 
-from sqlalchemy import Column, String, Boolean, DateTime, Text, JSON
+from sqlalchemy import Column, String, Boolean, DateTime, Text, Index
 from sqlalchemy.sql import func
 import uuid
 
 from app.db.database import Base
+from app.db.types import BinaryJSON
 
 
 class TargetGroup(Base):
@@ -16,7 +17,7 @@ class TargetGroup(Base):
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String(50), unique=True, nullable=False, index=True)
     description = Column(Text)
-    targets = Column(JSON, nullable=False)  # List of IPs/CIDRs
+    targets = Column(BinaryJSON, nullable=False)  # List of IPs/CIDRs
     enabled = Column(Boolean, default=True, nullable=False)
     
     # Metadata
@@ -52,4 +53,21 @@ class AllowlistEntry(Base):
     last_matched = Column(DateTime(timezone=True))
 
     def __repr__(self):
-        return f"<AllowlistEntry(id={self.id}, cidr={self.cidr}, type={self.entry_type})>"
\ No newline at end of file
+        return f"<AllowlistEntry(id={self.id}, cidr={self.cidr}, type={self.entry_type})>"
+
+
+# List endpoints read only enabled rows in these orders; partial indexes
+# let ORDER BY ... LIMIT walk the index instead of sorting the table
+Index(
+    "ix_target_groups_enabled_name",
+    TargetGroup.name,
+    postgresql_where=TargetGroup.enabled == True,
+    sqlite_where=TargetGroup.enabled == True
+)
+Index(
+    "ix_allowlist_entries_enabled_type_cidr",
+    AllowlistEntry.entry_type,
+    AllowlistEntry.cidr,
+    postgresql_where=AllowlistEntry.enabled == True,
+    sqlite_where=AllowlistEntry.enabled == True
+)
@@ -2,7 +2,7 @@
 User model
 """
 
-from sqlalchemy import Column, String, Boolean, DateTime, Text, JSON
+from sqlalchemy import Column, String, Boolean, DateTime, Text, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -47,12 +47,25 @@ class User(Base):
         return f"<User(id={self.id}, username={self.username}, role={self.role})>"
 
 
+# Backs keyset pagination in list_users (ORDER BY created_at DESC, id DESC)
+Index("ix_users_created_at_id", User.created_at.desc(), User.id.desc())
+
+# Covering index for the login lookup so it can be answered by an index-only scan
+Index(
+    "ix_users_login",
+    User.username,
+    postgresql_include=["hashed_password", "id", "role"],
+    postgresql_where=User.enabled == True,
+    sqlite_where=User.enabled == True
+)
+
+
 class ApiKey(Base):
     """API key model for programmatic access"""
     __tablename__ = "api_keys"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, nullable=False, index=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
     name = Column(String(100), nullable=False)
     key_hash = Column(String(255), nullable=False, unique=True, index=True)
     scopes = Column(JSON, nullable=False)  # List of scopes like ["jobs:read", "jobs:write"]
@@ -3,64 +3,167 @@ Network validation utilities
 """
 
 import ipaddress
-from typing import List, Set, Tuple
+from functools import lru_cache
+import socket
+import struct
+from typing import List, Optional, Tuple
 import re
-from netaddr import IPNetwork, IPSet
+from netaddr import IPNetwork
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import structlog
 
 from app.config import settings
 
 logger = structlog.get_logger()
 
+MULTICAST_RANGES = ["224.0.0.0/4", "ff00::/8"]
+
+
+class PrefixTrie:
+    """Binary prefix trie over the integer form of an address family"""
+    
+    __slots__ = ("bits", "_root", "_size")
+    
+    def __init__(self, bits: int):
+        self.bits = bits
+        # Nodes are [zero_child, one_child, terminal]
+        self._root: list = [None, None, False]
+        self._size = 0
+    
+    def add(self, network_address: int, prefixlen: int):
+        """Insert the top ``prefixlen`` bits of ``network_address``"""
+        node = self._root
+        shift = self.bits - 1
+        for _ in range(prefixlen):
+            if node[2]:
+                return  # Already covered by a shorter prefix
+            bit = (network_address >> shift) & 1
+            child = node[bit]
+            if child is None:
+                child = node[bit] = [None, None, False]
+            node = child
+            shift -= 1
+        node[2] = True
+        node[0] = node[1] = None  # Longer prefixes are now redundant
+        self._size += 1
+    
+    def contains(self, address: int) -> bool:
+        """Return True if any stored prefix covers ``address``"""
+        node = self._root
+        shift = self.bits - 1
+        while node is not None:
+            if node[2]:
+                return True
+            if shift < 0:
+                return False
+            node = node[(address >> shift) & 1]
+            shift -= 1
+        return False
+    
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+
+class RangeSet:
+    """IPv4/IPv6 CIDR set backed by one prefix trie per family"""
+    
+    __slots__ = ("_tries",)
+    
+    def __init__(self, cidrs: Optional[List[str]] = None, label: str = "range"):
+        self._tries = {32: PrefixTrie(32), 128: PrefixTrie(128)}
+        for cidr in cidrs or []:
+            try:
+                self.add(cidr)
+            except ValueError as e:
+                logger.warning(f"Invalid {label} CIDR", cidr=cidr, error=str(e))
+    
+    def add(self, cidr: str):
+        address, bits, prefixlen = _parse_target(cidr)
+        self._tries[bits].add(address, prefixlen)
+    
+    def contains(self, address: int, bits: int) -> bool:
+        return self._tries[bits].contains(address)
+    
+    def __bool__(self) -> bool:
+        return any(self._tries.values())
+
+
+def _address_to_int(address: str) -> Tuple[int, int]:
+    """Convert an IP address string to (integer value, address width in bits)"""
+    try:
+        return struct.unpack("!I", socket.inet_pton(socket.AF_INET, address))[0], 32
+    except OSError:
+        pass
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big"), 128
+    except OSError:
+        raise ValueError(f"{address!r} does not appear to be an IPv4 or IPv6 address")
+
+
+@lru_cache(maxsize=4096)
+def _parse_target(target: str) -> Tuple[int, int, int]:
+    """
+    Parse an IP or CIDR target using the C-level inet_pton parsers
+    Returns (network address, address width in bits, prefix length)
+    
+    Cached: target groups and allowlist rules are re-validated with the
+    same strings over and over. Invalid input raises and is not cached.
+    """
+    address, sep, prefix = target.partition('/')
+    value, bits = _address_to_int(address)
+    if not sep:
+        return value, bits, bits
+    
+    if not prefix.isdigit() or int(prefix) > bits:
+        raise ValueError(f"invalid prefix length /{prefix}")
+    host_bits = bits - int(prefix)
+    return (value >> host_bits) << host_bits, bits, int(prefix)
+
 
 class NetworkValidator:
     """Network validation and allowlist/denylist management"""
     
     def __init__(self):
-        self.allowed_ranges: IPSet = IPSet()
-        self.blocked_ranges: IPSet = IPSet()
-        self.allowed_broadcast_ranges: IPSet = IPSet()
-        
-        # Initialize default blocked ranges
-        for cidr in settings.default_blocked_ranges:
-            try:
-                self.blocked_ranges.add(IPNetwork(cidr))
-            except Exception as e:
-                logger.warning("Invalid default blocked range", cidr=cidr, error=str(e))
-        
-        # Initialize allowed broadcast ranges
-        for cidr in settings.allowed_broadcast_ranges:
-            try:
-                self.allowed_broadcast_ranges.add(IPNetwork(cidr))
-            except Exception as e:
-                logger.warning("Invalid allowed broadcast range", cidr=cidr, error=str(e))
+        self.allowed_ranges = RangeSet()
+        self.blocked_ranges = RangeSet(settings.default_blocked_ranges, "default blocked range")
+        self.allowed_broadcast_ranges = RangeSet(settings.allowed_broadcast_ranges, "allowed broadcast range")
+        self.multicast_ranges = RangeSet(MULTICAST_RANGES)
     
     def update_allowlist(self, allowed_cidrs: List[str]):
         """Update the allowlist with new CIDR ranges"""
-        self.allowed_ranges = IPSet()
-        for cidr in allowed_cidrs:
-            try:
-                self.allowed_ranges.add(IPNetwork(cidr))
-            except Exception as e:
-                logger.warning("Invalid allowlist CIDR", cidr=cidr, error=str(e))
+        self.allowed_ranges = RangeSet(allowed_cidrs, "allowlist")
     
     def update_blocklist(self, blocked_cidrs: List[str]):
         """Update the blocklist with new CIDR ranges"""
-        self.blocked_ranges = IPSet()
-        
         # Always include default blocked ranges
-        for cidr in settings.default_blocked_ranges:
-            try:
-                self.blocked_ranges.add(IPNetwork(cidr))
-            except Exception as e:
-                logger.warning("Invalid default blocked range", cidr=cidr, error=str(e))
+        self.blocked_ranges = RangeSet(
+            list(settings.default_blocked_ranges) + list(blocked_cidrs), "blocklist"
+        )
+    
+    def add_entry(self, cidr: str, entry_type: str = "allow"):
+        """Insert a single allowlist/denylist rule into the live tries"""
+        ranges = self.blocked_ranges if entry_type == "deny" else self.allowed_ranges
+        try:
+            ranges.add(cidr)
+        except ValueError as e:
+            logger.warning("Invalid allowlist CIDR", cidr=cidr, error=str(e))
+    
+    async def reload(self, db: AsyncSession):
+        """Rebuild the allow/deny tries from enabled allowlist entries"""
+        from app.models.target_group import AllowlistEntry
         
-        # Add custom blocked ranges
-        for cidr in blocked_cidrs:
-            try:
-                self.blocked_ranges.add(IPNetwork(cidr))
-            except Exception as e:
-                logger.warning("Invalid blocklist CIDR", cidr=cidr, error=str(e))
+        result = await db.execute(
+            select(AllowlistEntry.cidr, AllowlistEntry.entry_type)
+            .where(AllowlistEntry.enabled == True)
+        )
+        allowed, blocked = [], []
+        for cidr, entry_type in result.all():
+            (blocked if entry_type == "deny" else allowed).append(cidr)
+        
+        self.update_allowlist(allowed)
+        self.update_blocklist(blocked)
+        logger.info("Network validator reloaded", allowed=len(allowed), blocked=len(blocked))
     
     def validate_target(self, target: str) -> Tuple[bool, str]:
         """
@@ -68,42 +171,47 @@ class NetworkValidator:
         Returns (is_valid, error_message)
         """
         try:
-            # Parse target as IP or CIDR
-            if '/' in target:
-                network = IPNetwork(target)
-                ip_to_check = network.network
-                is_broadcast = network.size > 1
-            else:
-                ip_to_check = ipaddress.ip_address(target)
-                is_broadcast = False
-            
-            # Check if it's blocked
-            if ip_to_check in self.blocked_ranges:
-                return False, f"Target {target} is in blocked range"
-            
-            # Check if broadcast/multicast is allowed
-            if is_broadcast or ip_to_check.is_multicast:
-                if ip_to_check not in self.allowed_broadcast_ranges:
-                    return False, f"Broadcast/multicast target {target} not in allowed ranges"
-            
-            # Check if it's in allowlist (if allowlist is configured)
-            if self.allowed_ranges and ip_to_check not in self.allowed_ranges:
-                return False, f"Target {target} not in allowed ranges"
-            
-            return True, ""
-            
+            return self._check_target(target, *_parse_target(target))
         except Exception as e:
             return False, f"Invalid target format: {target} ({str(e)})"
     
+    def _check_target(self, target: str, address: int, bits: int, prefixlen: int) -> Tuple[bool, str]:
+        """Apply block/broadcast/allow rules to an already parsed target"""
+        is_broadcast = prefixlen < bits
+        
+        # Check if it's blocked
+        if self.blocked_ranges.contains(address, bits):
+            return False, f"Target {target} is in blocked range"
+        
+        # Check if broadcast/multicast is allowed
+        if is_broadcast or self.multicast_ranges.contains(address, bits):
+            if not self.allowed_broadcast_ranges.contains(address, bits):
+                return False, f"Broadcast/multicast target {target} not in allowed ranges"
+        
+        # Check if it's in allowlist (if allowlist is configured)
+        if self.allowed_ranges and not self.allowed_ranges.contains(address, bits):
+            return False, f"Target {target} not in allowed ranges"
+        
+        return True, ""
+    
     def validate_targets(self, targets: List[str]) -> Tuple[bool, List[str]]:
         """
         Validate a list of targets
         Returns (all_valid, error_messages)
         """
         errors = []
+        parsed = []
         
+        # First pass: syntax only, so malformed input fails before any rule lookups
         for target in targets:
-            is_valid, error = self.validate_target(target)
+            try:
+                parsed.append((target, *_parse_target(target)))
+            except ValueError as e:
+                errors.append(f"Invalid target format: {target} ({str(e)})")
+        
+        # Second pass: allow/deny containment on well-formed targets
+        for target, address, bits, prefixlen in parsed:
+            is_valid, error = self._check_target(target, address, bits, prefixlen)
             if not is_valid:
                 errors.append(error)
         
@@ -139,12 +247,17 @@ def validate_ip_address(ip_str: str) -> bool:
 def validate_cidr(cidr_str: str) -> bool:
     """Validate CIDR format"""
     try:
-        IPNetwork(cidr_str)
+        _parse_target(cidr_str)
         return True
-    except:
+    except ValueError:
         return False
 
 
+def target_parse_cache_info():
+    """Hit/miss statistics for the cached target parser"""
+    return _parse_target.cache_info()
+
+
 def validate_port(port: int) -> bool:
     """Validate port number"""
     return 1 <= port <= 65535